@@ -2,12 +2,15 @@ from flask import Flask
 from extensions import jwt
 from flask_cors import CORS
 import os
-from mongoengine import connect
+import metrics  # Registers the MongoDB command listener before any client exists
+from database import init_db, warm_up, readiness
+from fastjson import init_json
+from compression import init_compression
 from dotenv import load_dotenv
-import certifi
+from werkzeug.middleware.proxy_fix import ProxyFix
 import dns.resolver
 from datetime import timedelta
-import sys
+import time
 
 # Removed manual DNS resolver config to rely on system defaults
 # dns.resolver.default_resolver = dns.resolver.Resolver(configure=False)
@@ -16,45 +19,28 @@ import sys
 load_dotenv()
 
 def create_app():
+    started = time.perf_counter()
     app = Flask(__name__)
+    # Behind a load balancer (Render) every peer address is the proxy's; PROXY_HOPS
+    # trusted X-Forwarded-For entries make request.remote_addr the client again
+    proxy_hops = int(os.getenv('PROXY_HOPS', 0))
+    if proxy_hops:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxy_hops, x_proto=proxy_hops)
+    # orjson for jsonify when installed; gzip/brotli negotiated per request
+    init_json(app)
+    init_compression(app)
     # Allow all origins, methods, and headers for development simplicity
     CORS(app, resources={r"/*": {"origins": "*", "methods": ["GET", "POST", "OPTIONS", "PUT", "DELETE"], "allow_headers": "*"}})
 
-    # MongoDB Atlas Connection
-    MONGO_URI = os.getenv('MONGO_URI')
-    ca = certifi.where()
-    
-    # Try to connect to MongoDB with retries
-    connected = False
-    for attempt in range(3):
-        try:
-            print(f"🔄 Attempting to connect to MongoDB (Attempt {attempt + 1}/3)...")
-            connect(
-                host=MONGO_URI, 
-                tlsCAFile=ca,
-                serverSelectionTimeoutMS=20000, # Increased timeout
-                connectTimeoutMS=20000,
-                socketTimeoutMS=20000,
-                uuidRepresentation='standard'
-            )
-            # Verify connection
-            from models import User
-            User.objects.first() 
-            print("✅ Successfully connected to MongoDB Atlas!")
-            connected = True
-            break
-        except Exception as e:
-            print(f"⚠️ Connection attempt {attempt + 1} failed: {str(e)}")
-            import time
-            time.sleep(2)
-    
-    if not connected:
-        print("❌ CRITICAL: Could not connect to MongoDB after 3 attempts. Aborting start-up.")
-        print("Please check your internet connection or verify your MONGO_URI in .env.")
-        sys.exit(1)
+    # MongoDB Atlas Connection: registered lazily, opened by each worker on first use
+    init_db(os.getenv('MONGO_URI'))
+    # Connect and verify indexes off the request path once the worker is serving
+    app.before_request(warm_up)
 
     app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'default-key')
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(days=7)
+    # Headers only; the event stream alone also accepts ?jwt= (EventSource cannot set headers)
+    app.config['JWT_TOKEN_LOCATION'] = ['headers']
     app.config['UPLOAD_FOLDER'] = 'uploads'
 
     if not os.path.exists(app.config['UPLOAD_FOLDER']):
@@ -64,13 +50,41 @@ def create_app():
 
     with app.app_context():
         from routes import api
+        from events import events_api
+        metrics.instrument(api)
+        metrics.instrument(events_api)
         app.register_blueprint(api)
+        # Capped at MAX_STREAMS per worker here; deploy events_app.py to serve many
+        app.register_blueprint(events_api)
 
     @app.route('/uploads/<path:filename>')
     def serve_uploads(filename):
         from flask import send_from_directory
+        from blobstore import is_blob_key, send_blob
+        if is_blob_key(filename):
+            response = send_blob(filename)
+            if response is not None:
+                return response
         return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
 
+    @app.route('/healthz')
+    def healthz():
+        # Liveness: the process is up and serving; never touches MongoDB
+        return {"status": "ok", "startup_ms": app.config['STARTUP_MS']}
+
+    @app.route('/metrics')
+    def prometheus_metrics():
+        # Per-route latency, response size and MongoDB command counts, summed across workers
+        return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4'}
+
+    @app.route('/readyz')
+    def readyz():
+        # Readiness: MongoDB reachable and declared indexes present
+        ready, checks = readiness()
+        return {"ready": ready, **checks}, 200 if ready else 503
+
+    app.config['STARTUP_MS'] = round((time.perf_counter() - started) * 1000, 1)
+    print(f"🚀 App created in {app.config['STARTUP_MS']}ms (pid {os.getpid()})")
     return app
 
 app = create_app()
@@ -0,0 +1,57 @@
+from flask import g, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from users import cached_user
+from bson import ObjectId
+from collections import namedtuple
+from functools import wraps, lru_cache
+import json
+
+
+class Identity(namedtuple('Identity', 'id role name')):
+    """Claims from the access token: user id (str), role and name at login."""
+    __slots__ = ()
+
+    @property
+    def object_id(self):
+        return ObjectId(self.id)
+
+    def user(self):
+        """The current user record (cached; see users.py) for fields the token may have stale."""
+        return cached_user(self.id)
+
+
+@lru_cache(maxsize=4096)
+def _parse(raw):
+    # Tokens are reused for days, so the same identity string repeats across requests
+    try:
+        claims = json.loads(raw)
+        return Identity(str(claims['id']), claims['role'], claims.get('name'))
+    except (TypeError, ValueError, KeyError):
+        return None
+
+
+def requires_role(*roles, locations=None):
+    """
+    Require a valid access token and, if roles are given, one of them.
+    The parsed claims are available to the view as current_identity().
+    Answers 422 for an unreadable identity and 403 for the wrong role.
+    `locations` overrides JWT_TOKEN_LOCATION for this view only.
+    """
+    def decorator(view):
+        @wraps(view)
+        @jwt_required(locations=locations)
+        def wrapper(*args, **kwargs):
+            raw = get_jwt_identity()
+            identity = _parse(raw) if isinstance(raw, str) else _parse(json.dumps(raw))
+            if identity is None:
+                return jsonify({"msg": "Invalid token"}), 422
+            if roles and identity.role not in roles:
+                return jsonify({"msg": "Unauthorized"}), 403
+            g.identity = identity
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_identity():
+    return g.identity
@@ -0,0 +1,4 @@
+# Benchmarks run against the database in MONGO_URI; point it at a scratch
+# local mongod, e.g. MONGO_URI=mongodb://localhost:27017/agri_bench, or use
+# MONGO_URI=mongomock://localhost/agri_bench (pip install mongomock) to run
+# without a server. benchmarks.run seeds data and writes a comparable baseline.
@@ -0,0 +1,69 @@
+"""
+Per-request auth overhead: the old inline json.loads + role check against
+@requires_role, with and without a cached user record. Needs no database.
+
+    cd backend && python -m benchmarks.bench_auth --repeat 20000
+"""
+from types import SimpleNamespace
+from bson import ObjectId
+import argparse
+import json
+import statistics
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20000)
+    args = parser.parse_args()
+
+    from flask import Flask, jsonify
+    from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
+    from auth import requires_role, current_identity
+    import users
+
+    app = Flask(__name__)
+    app.config['JWT_SECRET_KEY'] = 'bench'
+    JWTManager(app)
+
+    @jwt_required()
+    def inline():
+        raw_identity = get_jwt_identity()
+        try:
+            identity = json.loads(raw_identity) if isinstance(raw_identity, str) else raw_identity
+        except: return jsonify({"msg": "Invalid token"}), 422
+        if identity['role'] != 'farmer': return jsonify({"msg": "Unauthorized"}), 403
+        return identity['id']
+
+    @requires_role('farmer')
+    def decorated():
+        return current_identity().id
+
+    @requires_role('farmer')
+    def decorated_with_user():
+        return current_identity().user().name
+
+    user_id = str(ObjectId())
+    # Pre-warmed entry: measures a cache hit, the steady state for an active user
+    users._entries[user_id] = (float('inf'), SimpleNamespace(id=user_id, name='Bench Farmer', role='farmer'))
+    with app.app_context():
+        token = create_access_token(identity=json.dumps({'id': user_id, 'role': 'farmer', 'name': 'Bench Farmer'}))
+
+    report = {"repeat": args.repeat, "views": {}}
+    for name, view in (('inline', inline), ('requires_role', decorated), ('requires_role+user', decorated_with_user)):
+        samples = []
+        with app.test_request_context(headers={'Authorization': f'Bearer {token}'}):
+            for _ in range(args.repeat):
+                t = time.perf_counter()
+                view()
+                samples.append((time.perf_counter() - t) * 1e6)
+        samples.sort()
+        report["views"][name] = {
+            "p50_us": round(statistics.median(samples), 1),
+            "p99_us": round(samples[int(len(samples) * 0.99) - 1], 1)
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
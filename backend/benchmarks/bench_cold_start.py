@@ -0,0 +1,43 @@
+"""
+Measure cold start: wall time for a fresh interpreter to import the app
+(what every gunicorn worker pays before it can serve).
+
+    cd backend && python -m benchmarks.bench_cold_start --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROBE = (
+    "import time; t = time.perf_counter(); import app; "
+    "print(round((time.perf_counter() - t) * 1000, 1))"
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    import_ms, process_ms = [], []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, '-c', PROBE], cwd=backend, capture_output=True, text=True, check=True)
+        process_ms.append((time.perf_counter() - start) * 1000)
+        import_ms.append(float(out.stdout.strip().splitlines()[-1]))
+
+    print(json.dumps({
+        "runs": args.runs,
+        "import_app_ms_median": round(statistics.median(import_ms), 1),
+        "import_app_ms_max": round(max(import_ms), 1),
+        "process_ms_median": round(statistics.median(process_ms), 1)
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Serialize time and bytes on the wire for catalog-shaped payloads: stock
+json provider vs orjson, identity vs gzip vs brotli. No database needed.
+
+    cd backend && python -m benchmarks.bench_json --sizes 50 200 1000 5000
+    cd backend && python -m benchmarks.bench_json --inline-images   # pre-migration base64 rows
+"""
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+import argparse
+import base64
+import json
+import os
+import random
+import time
+
+from fastjson import OrjsonProvider, orjson
+from compression import ENCODINGS
+from benchmarks.seed import VEGETABLES
+
+
+def catalog_items(n, inline_images, rng):
+    # Typical phone photos stored inline before migration 0002 (~60 KB each)
+    photos = ["data:image/jpeg;base64," + base64.b64encode(os.urandom(45_000)).decode()
+              for _ in range(8)] if inline_images else None
+    items = []
+    for _ in range(n):
+        sha = "%064x" % rng.getrandbits(256)
+        photo = rng.choice(photos) if photos else None
+        items.append({
+            "id": "%024x" % rng.getrandbits(96),
+            "name": rng.choice(VEGETABLES),
+            "price": round(rng.uniform(10, 120), 1),
+            "quantity": round(rng.uniform(50, 5000), 1),
+            "image": photo or f"/uploads/{sha}_512",
+            "image_full": photo or f"/uploads/{sha}",
+            "farmer_name": f"Farmer {rng.randrange(200)}"
+        })
+    return {"items": items, "next_cursor": "MjAyNi0xMC0xN1QxMjowMDowMHw2NTJmMDAwMDAwMDAwMDAwMDAwMDAwMDA="}
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - started)
+    return min(times) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50, 200, 1000, 5000])
+    parser.add_argument('--inline-images', action='store_true', help='base64 data URIs instead of blob URLs')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    app = Flask('bench')
+    providers = {'stock': DefaultJSONProvider(app)}
+    if orjson is not None:
+        providers['orjson'] = OrjsonProvider(app)
+    else:
+        print("⚠️ orjson is not installed; only the stock provider is measured")
+
+    rng = random.Random(42)
+    rows = []
+    with app.app_context():
+        for n in args.sizes:
+            payload = catalog_items(n, args.inline_images, rng)
+            row = {"items": n}
+            body = None
+            for name, provider in providers.items():
+                ms, response = best_of(lambda: provider.response(payload), args.repeat)
+                row[f"{name}_ms"] = round(ms, 3)
+                body = response.get_data()
+            row["identity_bytes"] = len(body)
+            for encoding, (encode, _) in ENCODINGS.items():
+                ms, compressed = best_of(lambda: encode(body), max(1, args.repeat // 4))
+                row[f"{encoding}_bytes"] = len(compressed)
+                row[f"{encoding}_ms"] = round(ms, 3)
+            rows.append(row)
+
+    print(json.dumps(rows, indent=2))
+    for row in rows:
+        speedup = f", orjson {row['stock_ms'] / row['orjson_ms']:.1f}x faster" if 'orjson_ms' in row else ""
+        wire = ", ".join(f"{e} {row['identity_bytes'] / row[f'{e}_bytes']:.1f}x smaller" for e in ENCODINGS)
+        print(f"📦 {row['items']:>5} items: {row['identity_bytes'] / 1024:,.0f} KB{speedup}; {wire}")
+
+
+if __name__ == '__main__':
+    main()
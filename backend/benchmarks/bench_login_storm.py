@@ -0,0 +1,102 @@
+"""
+Catalog latency with and without a concurrent login storm. Logins hash in
+the passwords.py process pool, so catalog p50/p95 should stay flat while
+the storm runs; excess logins are shed with 429/503 rather than queued.
+
+    cd backend && python -m benchmarks.bench_login_storm --mongomock --storm-threads 32
+
+Storm logins rotate through seeded accounts and client addresses so they
+reach the hashing pool instead of stopping at the per-account throttle.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+import argparse
+import json
+import os
+import random
+import threading
+import time
+
+from benchmarks.seed import seed, add_arguments, seed_kwargs, PASSWORD
+from benchmarks.run import Driver, percentile, require_scratch_database
+
+# Allowed catalog p95 growth under the storm before the run is reported as not flat
+DEFAULT_TOLERANCE = 0.25
+
+
+def measure_catalog(driver, requests, concurrency):
+    def timed(_):
+        started = time.perf_counter()
+        driver.catalog()
+        return (time.perf_counter() - started) * 1000
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(pool.map(timed, range(requests)))
+    return {"p50_ms": round(percentile(latencies, 50), 2), "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    parser.add_argument('--mongomock', action='store_true', help='run against an in-memory mongomock database')
+    parser.add_argument('--requests', type=int, default=500, help='catalog requests per phase')
+    parser.add_argument('--concurrency', type=int, default=4, help='catalog threads')
+    parser.add_argument('--storm-threads', type=int, default=32, help='threads logging in back to back')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    if args.mongomock:
+        os.environ['MONGO_URI'] = 'mongomock://localhost/agri_bench'
+    from app import app
+    require_scratch_database()
+
+    ids = seed(**seed_kwargs(args))
+    driver = Driver(app, ids, random.Random(args.seed))
+    for _ in range(20):
+        driver.catalog()
+    baseline = measure_catalog(driver, args.requests, args.concurrency)
+
+    stop = threading.Event()
+    statuses = Counter()
+    status_lock = threading.Lock()
+
+    def storm(n):
+        rng = random.Random(n)
+        with app.test_client() as client:
+            i = 0
+            while not stop.is_set():
+                body = {'email': rng.choice(ids['emails']), 'password': PASSWORD}
+                code = client.post('/api/auth/login', json=body,
+                                   environ_base={'REMOTE_ADDR': f"10.{n}.{i // 256 % 256}.{i % 256}"}).status_code
+                with status_lock:
+                    statuses[code] += 1
+                i += 1
+
+    threads = [threading.Thread(target=storm, args=(n,), daemon=True) for n in range(args.storm_threads)]
+    for t in threads:
+        t.start()
+    started = time.perf_counter()
+    try:
+        during = measure_catalog(driver, args.requests, args.concurrency)
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+    elapsed = time.perf_counter() - started
+
+    growth = (during['p95_ms'] - baseline['p95_ms']) / baseline['p95_ms'] if baseline['p95_ms'] else 0.0
+    print(json.dumps({
+        "catalog_alone": baseline,
+        "catalog_during_storm": during,
+        "p95_growth": round(growth, 3),
+        "logins": {str(code): count for code, count in sorted(statuses.items())},
+        "logins_per_sec": round(sum(statuses.values()) / elapsed, 1),
+        "flat": growth <= args.tolerance,
+    }, indent=2))
+    if growth > args.tolerance:
+        raise SystemExit(f"❌ Catalog p95 grew {growth:.0%} during the login storm")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Hammer one product from many threads through /api/buyer/order and check
+that stock is never oversold.
+
+    cd backend && python -m benchmarks.bench_place_order --mongomock --threads 32 --stock 500
+
+Without --mongomock it uses MONGO_URI, which must name a scratch database
+(see benchmarks.run). Orders, the listing, its users and the rollup and
+price-bar entries it produced are removed afterwards; notification events
+stay in the capped log until they age out.
+"""
+from flask_jwt_extended import create_access_token
+from concurrent.futures import ThreadPoolExecutor
+from collections import defaultdict
+import argparse
+import json
+import os
+import time
+
+from benchmarks.run import require_scratch_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--stock', type=float, default=500)
+    parser.add_argument('--qty', type=float, default=1, help='kg per order')
+    parser.add_argument('--attempts', type=int, default=None, help='total orders to attempt (default: 2x what stock allows)')
+    parser.add_argument('--mongomock', action='store_true', help='run against an in-memory mongomock database')
+    args = parser.parse_args()
+
+    if args.mongomock:
+        os.environ['MONGO_URI'] = 'mongomock://localhost/agri_bench'
+    from app import app
+    from models import User, Product, Order, DailyStat, PriceBar, Tombstone
+    from search import normalize
+    require_scratch_database()
+
+    farmer = User(name='Bench Farmer', email=f'bench-farmer-{time.time()}@bench', password='x', role='farmer').save()
+    buyer = User(name='Bench Buyer', email=f'bench-buyer-{time.time()}@bench', password='x', role='buyer').save()
+    product = Product(farmer=farmer, vegetable_name='bench-tomato', market_price=10, farmer_earnings=8.5,
+                      quantity=args.stock, status='approved').save()
+    with app.app_context():
+        token = create_access_token(identity=json.dumps({'id': str(buyer.id), 'role': 'buyer', 'name': buyer.name}))
+    headers = {'Authorization': f'Bearer {token}'}
+    body = {'product_id': str(product.id), 'quantity': args.qty, 'delivery_address': 'bench'}
+    attempts = args.attempts or int(2 * args.stock / args.qty)
+
+    def place(_):
+        with app.test_client() as client:
+            return client.post('/api/buyer/order', json=body, headers=headers).status_code
+
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            codes = list(pool.map(place, range(attempts)))
+        elapsed = time.perf_counter() - start
+
+        accepted = codes.count(201)
+        remaining = Product.objects(id=product.id).scalar('quantity').first()
+        ordered = sum(Order.objects(product=product.id).scalar('quantity'))
+        oversold = max(0.0, ordered - args.stock)
+        print(json.dumps({
+            "threads": args.threads,
+            "attempts": attempts,
+            "accepted": accepted,
+            "rejected": codes.count(400),
+            "orders_per_sec": round(accepted / elapsed, 1),
+            "elapsed_s": round(elapsed, 3),
+            "remaining_stock": remaining,
+            "oversold_kg": oversold,
+            "consistent": oversold == 0 and remaining >= 0 and abs(args.stock - ordered - remaining) < 1e-6
+        }, indent=2))
+        if oversold or remaining < 0:
+            raise SystemExit("❌ Oversell detected")
+    finally:
+        # Take this run's orders back out of the daily rollup before deleting them
+        days = defaultdict(lambda: [0, 0.0, 0.0])
+        for o in Order.objects(product=product.id).only('created_at', 'quantity', 'total_price'):
+            day = days[o.created_at.strftime("%Y-%m-%d")]
+            day[0] += 1
+            day[1] += o.quantity
+            day[2] += o.total_price
+        for day, (count, quantity, revenue) in days.items():
+            DailyStat.objects(day=day).update_one(
+                inc__orders=-count, inc__quantity=-quantity, inc__revenue=-revenue)
+        PriceBar.objects(key=normalize(product.vegetable_name)).delete()
+        Order.objects(product=product.id).delete()
+        product.delete()
+        Tombstone.objects(doc_id=product.id).delete()
+        farmer.delete()
+        buyer.delete()
+
+
+if __name__ == '__main__':
+    main()
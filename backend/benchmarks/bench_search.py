@@ -0,0 +1,63 @@
+"""
+Per-query latency of the in-process catalog search index on a synthetic
+catalog. Needs no database.
+
+    cd backend && python -m benchmarks.bench_search --listings 100000
+"""
+from types import SimpleNamespace
+from bson import ObjectId
+import argparse
+import json
+import random
+import statistics
+import time
+
+VEGETABLES = ["Tomato", "Cherry Tomato", "Potato", "Sweet Potato", "Onion", "Red Onion", "Spring Onion",
+              "Carrot", "Cabbage", "Cauliflower", "Brinjal", "Okra", "Spinach", "Green Chilli", "Capsicum",
+              "Garlic", "Ginger", "Beetroot", "Radish", "Cucumber", "Pumpkin", "Bottle Gourd", "Bitter Gourd",
+              "Beans", "Peas", "Coriander", "Mint", "Drumstick", "Mushroom", "Sweet Corn"]
+
+QUERIES = [
+    {"query": "tom"},
+    {"query": "on", "min_price": 20, "max_price": 40},
+    {"query": "sweet p", "min_quantity": 50},
+    {"query": "", "k": 20},
+    {"query": "g", "descending": True},
+    {"query": "", "min_price": 10, "max_price": 12},
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--listings', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    from search import CatalogIndex
+    rng = random.Random(42)
+    index = CatalogIndex()
+    start = time.perf_counter()
+    for _ in range(args.listings):
+        index.upsert(SimpleNamespace(
+            id=ObjectId(), vegetable_name=rng.choice(VEGETABLES), market_price=round(rng.uniform(5, 120), 2),
+            quantity=round(rng.uniform(10, 500), 1), image_url="", farmer=None, farmer_name=None, status='approved'))
+    build_s = time.perf_counter() - start
+
+    report = {"listings": args.listings, "build_s": round(build_s, 2), "queries": []}
+    for q in QUERIES:
+        samples = []
+        for _ in range(args.repeat):
+            t = time.perf_counter()
+            index.search(**q)
+            samples.append((time.perf_counter() - t) * 1e6)
+        samples.sort()
+        report["queries"].append({
+            **q,
+            "p50_us": round(statistics.median(samples), 1),
+            "p99_us": round(samples[int(len(samples) * 0.99) - 1], 1)
+        })
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
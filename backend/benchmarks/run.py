@@ -0,0 +1,241 @@
+"""
+Reproducible load test: seed a scratch database, drive the hot routes at a
+fixed concurrency and write a JSON baseline; compare it with an earlier run.
+
+    cd backend
+    python -m benchmarks.run --mongomock --out baseline.json
+    python -m benchmarks.run --mongomock --out after.json --compare baseline.json
+
+Without --mongomock the run uses MONGO_URI, which must name a scratch
+database (its name has to contain "bench"). Latency is measured around the
+in-process WSGI call, so it covers routing, queries and serialization but not
+the network. Queries per request come from the MongoDB command listener in
+metrics.py; mongomock issues no wire commands, so they read null there.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks.seed import seed, add_arguments, seed_kwargs, PASSWORD
+
+SCENARIOS = ('catalog', 'place_order', 'admin_stats', 'login')
+# Relative worsening allowed before --compare reports a regression
+DEFAULT_TOLERANCE = 0.15
+
+
+def require_scratch_database():
+    from mongoengine.connection import get_db
+    name = get_db().name
+    if 'bench' not in name and not os.getenv('MONGO_URI', '').startswith('mongomock://'):
+        sys.exit(f"❌ Refusing to seed '{name}': point MONGO_URI at a scratch database whose name contains 'bench'")
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Driver:
+    """Builds one request per call for each scenario, from the seeded ids."""
+
+    def __init__(self, app, ids, rng):
+        from flask_jwt_extended import create_access_token
+        from models import User
+        self.app = app
+        self.ids = ids
+        self.rng = rng
+        self.local = threading.local()
+        self.addresses = itertools.count()
+        with app.app_context():
+            def bearer(user_id):
+                user = User.objects(id=user_id).only('name', 'role').first()
+                identity = json.dumps({'id': str(user.id), 'role': user.role, 'name': user.name})
+                return {'Authorization': f'Bearer {create_access_token(identity=identity)}'}
+            self.buyer_headers = [bearer(b) for b in ids['buyers'][:20]]
+            self.admin_headers = bearer(ids['admin'])
+
+    def client(self):
+        if not hasattr(self.local, 'client'):
+            self.local.client = self.app.test_client()
+            self.local.cursor = None
+        return self.local.client
+
+    def catalog(self):
+        # Each thread pages through the catalog like a scrolling buyer
+        client = self.client()
+        url = '/api/buyer/products' + (f'?cursor={self.local.cursor}' if self.local.cursor else '')
+        response = client.get(url, headers=self.rng.choice(self.buyer_headers))
+        if response.status_code == 200:
+            self.local.cursor = response.get_json().get('next_cursor')
+        return response.status_code == 200
+
+    def place_order(self):
+        body = {'product_id': str(self.rng.choice(self.ids['approved'])), 'quantity': 1, 'delivery_address': 'bench'}
+        response = self.client().post('/api/buyer/order', json=body, headers=self.rng.choice(self.buyer_headers))
+        # A listing that has sold out is a valid answer, not an error
+        return response.status_code in (201, 400)
+
+    def admin_stats(self):
+        return self.client().get('/api/admin/stats', headers=self.admin_headers).status_code == 200
+
+    def login(self):
+        # Each login from its own address, cycling through the accounts, so the per-address
+        # and per-account throttles (throttle.py) don't turn this into a measurement of 429s
+        n = next(self.addresses)
+        body = {'email': self.ids['emails'][n % len(self.ids['emails'])], 'password': PASSWORD}
+        address = f"10.{n // 65536 % 256}.{n // 256 % 256}.{n % 256}"
+        return self.client().post('/api/auth/login', json=body,
+                                  environ_base={'REMOTE_ADDR': address}).status_code == 200
+
+
+ROUTES = {
+    'catalog': ('/api/buyer/products', 'GET'),
+    'place_order': ('/api/buyer/order', 'POST'),
+    'admin_stats': ('/api/admin/stats', 'GET'),
+    'login': ('/api/auth/login', 'POST'),
+}
+
+
+def run_scenario(driver, name, requests, concurrency, warmup):
+    import metrics
+    call = getattr(driver, name)
+    for _ in range(warmup):
+        call()
+
+    route = ROUTES[name]
+    before = metrics.command_totals().get(route, (0, 0))
+    commands_before = sum(metrics._counters['mongo_commands_total'].values())
+
+    def timed(_):
+        started = time.perf_counter()
+        ok = call()
+        return time.perf_counter() - started, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(timed, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    after = metrics.command_totals().get(route, (0, 0))
+    observed = sum(metrics._counters['mongo_commands_total'].values()) > commands_before
+    served = after[1] - before[1]
+    latencies = sorted(r[0] * 1000 for r in results)
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": sum(1 for _, ok in results if not ok),
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "mean_ms": round(statistics.fmean(latencies), 2),
+        "queries_per_request": round((after[0] - before[0]) / served, 2) if observed and served else None,
+    }
+
+
+def compare(current, baseline, tolerance):
+    """Print per-scenario deltas; return the regressions found."""
+    regressions = []
+    print(f"\n{'scenario':<13}{'metric':<21}{'baseline':>10}{'current':>10}{'change':>9}")
+    for name, now in current['scenarios'].items():
+        old = baseline.get('scenarios', {}).get(name)
+        if not old:
+            continue
+        for metric, higher_is_worse in (('p50_ms', True), ('p95_ms', True), ('p99_ms', True),
+                                        ('throughput_rps', False), ('queries_per_request', True)):
+            a, b = old.get(metric), now.get(metric)
+            if a is None or b is None:
+                continue
+            change = (b - a) / a if a else (0.0 if b == a else float('inf'))
+            worse = change > tolerance if higher_is_worse else change < -tolerance
+            # Query counts are exact, so any increase is a regression
+            if metric == 'queries_per_request':
+                worse = b > a
+            flag = " ❌" if worse else ""
+            print(f"{name:<13}{metric:<21}{a:>10}{b:>10}{change:>+9.0%}{flag}")
+            if worse:
+                regressions.append((name, metric, a, b))
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    parser.add_argument('--mongomock', action='store_true', help='run against an in-memory mongomock database')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--requests', type=int, default=500, help='measured requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--warmup', type=int, default=20, help='unmeasured requests per scenario')
+    parser.add_argument('--out', help='write the results as JSON here')
+    parser.add_argument('--compare', help='baseline JSON from an earlier run')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='relative worsening allowed by --compare (default 0.15)')
+    args = parser.parse_args()
+
+    if args.mongomock:
+        os.environ['MONGO_URI'] = 'mongomock://localhost/agri_bench'
+    from app import app
+    require_scratch_database()
+
+    started = time.perf_counter()
+    ids = seed(**seed_kwargs(args))
+    print(f"🌱 Seeded {args.farmers} farmers, {args.buyers} buyers, {args.products} products, "
+          f"{args.orders} orders in {time.perf_counter() - started:.1f}s")
+
+    driver = Driver(app, ids, random.Random(args.seed))
+    results = {}
+    for name in args.scenarios:
+        results[name] = run_scenario(driver, name, args.requests, args.concurrency, args.warmup)
+        r = results[name]
+        print(f"⏱️  {name:<12} p50 {r['p50_ms']:>8}ms  p95 {r['p95_ms']:>8}ms  p99 {r['p99_ms']:>8}ms  "
+              f"{r['throughput_rps']:>8} req/s  queries/req {r['queries_per_request']}  errors {r['errors']}")
+
+    report = {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(timespec='seconds'),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "database": 'mongomock' if args.mongomock else 'mongodb',
+            "params": {k: v for k, v in vars(args).items() if k not in ('out', 'compare', 'tolerance')},
+        },
+        "scenarios": results,
+    }
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Wrote {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get('meta', {}).get('params') != report['meta']['params']:
+            print("⚠️ Baseline was recorded with different parameters; deltas may not be comparable")
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+            sys.exit(1)
+        print("✅ No regressions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Synthetic marketplace generator: farmers, buyers, listings with real JPEG
+images, and historical orders, bulk-inserted into the configured database.
+
+    cd backend && MONGO_URI=mongomock://localhost/agri_bench python -m benchmarks.seed --products 2000
+"""
+from werkzeug.security import generate_password_hash
+from datetime import datetime, timedelta
+import argparse
+import io
+import random
+
+# Shared by every seeded account so the login benchmark can authenticate
+PASSWORD = 'bench-password'
+VEGETABLES = ["Tomato", "Potato", "Onion", "Carrot", "Cabbage", "Cauliflower", "Brinjal", "Okra",
+              "Spinach", "Green Chilli", "Capsicum", "Garlic", "Ginger", "Beetroot", "Cucumber", "Peas"]
+INSERT_CHUNK_SIZE = 1000
+# Distinct photos; listings reuse them the way re-uploaded photos dedupe in the blob store
+DISTINCT_IMAGES = 24
+
+
+def _photo(rng, size_kb):
+    """A noisy JPEG of roughly size_kb, so thumbnails and payloads are realistic."""
+    from PIL import Image
+    side = 64
+    while True:
+        pixels = bytes(rng.getrandbits(8) for _ in range(side * side * 3))
+        out = io.BytesIO()
+        Image.frombytes('RGB', (side, side), pixels).save(out, format='JPEG', quality=85)
+        if out.tell() >= size_kb * 1024 or side >= 2048:
+            return out.getvalue()
+        side = int(side * 1.4)
+
+
+def _insert(model, docs):
+    for start in range(0, len(docs), INSERT_CHUNK_SIZE):
+        model.objects.insert(docs[start:start + INSERT_CHUNK_SIZE], load_bulk=False)
+
+
+def seed(farmers=50, buyers=200, products=2000, orders=5000, image_kb=80, days=90, seed=42):
+    """Populate the database and return the ids the benchmarks drive."""
+    from models import User, Product, Order, DailyStat
+    from blobstore import store_image
+    from listings import calculate_price
+
+    rng = random.Random(seed)
+    password = generate_password_hash(PASSWORD)
+    tag = f"{seed}-{rng.getrandbits(32):08x}"
+
+    users = [User(name=f"Farmer {i}", email=f"farmer{i}-{tag}@bench", password=password, role='farmer')
+             for i in range(farmers)]
+    users += [User(name=f"Buyer {i}", email=f"buyer{i}-{tag}@bench", password=password, role='buyer')
+              for i in range(buyers)]
+    users.append(User(name="Bench Admin", email=f"admin-{tag}@bench", password=password, role='admin'))
+    _insert(User, users)
+    farmer_docs, buyer_docs, admin = users[:farmers], users[farmers:-1], users[-1]
+
+    images = [store_image(_photo(rng, image_kb)) for _ in range(min(DISTINCT_IMAGES, products) if image_kb else 0)]
+    now = datetime.utcnow()
+    product_docs = []
+    for i in range(products):
+        price = round(rng.uniform(10, 120), 1)
+        farmer = rng.choice(farmer_docs)
+        product_docs.append(Product(
+            farmer=farmer.id,
+            farmer_name=farmer.name,
+            vegetable_name=rng.choice(VEGETABLES),
+            market_price=price,
+            farmer_earnings=calculate_price(price, 0)[0],
+            quantity=round(rng.uniform(50, 5000), 1),
+            image_url=rng.choice(images) if images else "",
+            status=rng.choices(['approved', 'pending', 'refused'], weights=[80, 15, 5])[0],
+            created_at=now - timedelta(seconds=rng.uniform(0, days * 86400))
+        ))
+    _insert(Product, product_docs)
+
+    order_docs = []
+    for _ in range(orders):
+        product = rng.choice(product_docs)
+        buyer = rng.choice(buyer_docs)
+        qty = round(rng.uniform(1, 20), 1)
+        order_docs.append(Order(
+            buyer=buyer.id,
+            product=product.id,
+            farmer=product.farmer,
+            buyer_name=buyer.name,
+            product_name=product.vegetable_name,
+            farmer_name=product.farmer_name,
+            quantity=qty,
+            total_price=round(qty * product.market_price, 2),
+            payment_method=rng.choice(['UPI', 'Cash', 'Card']),
+            delivery_address=f"{rng.randint(1, 999)} Bench Road",
+            created_at=max(product.created_at, now - timedelta(seconds=rng.uniform(0, days * 86400)))
+        ))
+    _insert(Order, order_docs)
+
+    # Daily rollup for the seeded history, as migration 0003 would build it
+    for row in Order.objects.aggregate([{"$group": {
+            "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+            "orders": {"$sum": 1}, "quantity": {"$sum": "$quantity"}, "revenue": {"$sum": "$total_price"}}}]):
+        DailyStat.objects(day=row['_id']).update_one(
+            set__orders=row['orders'], set__quantity=row['quantity'], set__revenue=row['revenue'], upsert=True)
+
+    return {
+        "farmers": [u.id for u in farmer_docs],
+        "buyers": [u.id for u in buyer_docs],
+        "admin": admin.id,
+        "emails": [u.email for u in users],
+        "approved": [p.id for p in product_docs if p.status == 'approved'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    args = parser.parse_args()
+    import app  # noqa: F401  (connects to MONGO_URI)
+    from benchmarks.run import require_scratch_database
+    require_scratch_database()
+    ids = seed(**seed_kwargs(args))
+    print(f"✅ Seeded {len(ids['farmers'])} farmers, {len(ids['buyers'])} buyers, "
+          f"{args.products} products ({len(ids['approved'])} approved), {args.orders} orders")
+
+
+def add_arguments(parser):
+    parser.add_argument('--farmers', type=int, default=50)
+    parser.add_argument('--buyers', type=int, default=200)
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--orders', type=int, default=5000)
+    parser.add_argument('--image-kb', type=int, default=80, help='approximate size of each listing photo (0 for none)')
+    parser.add_argument('--seed', type=int, default=42)
+
+
+def seed_kwargs(args):
+    return dict(farmers=args.farmers, buyers=args.buyers, products=args.products, orders=args.orders,
+                image_kb=args.image_kb, seed=args.seed)
+
+
+if __name__ == '__main__':
+    main()
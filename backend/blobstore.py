@@ -0,0 +1,106 @@
+from flask import request, make_response
+from models import Blob
+from PIL import Image
+import hashlib
+import io
+
+UPLOAD_PREFIX = '/uploads/'
+# Pre-generated thumbnail widths (px); catalog cards use the medium one
+THUMBNAIL_SIZES = (128, 512)
+CATALOG_THUMBNAIL = 512
+CACHE_MAX_AGE = 365 * 24 * 3600
+# Accepted upload formats (as detected by PIL) and the type each is stored and served as
+IMAGE_TYPES = {'JPEG': 'image/jpeg', 'PNG': 'image/png', 'GIF': 'image/gif', 'WEBP': 'image/webp'}
+
+
+def _put(key, data, content_type):
+    # Upsert so concurrent uploads of the same image never write it twice
+    Blob.objects(key=key).update_one(
+        set_on_insert__content_type=content_type,
+        set_on_insert__size=len(data),
+        set_on_insert__data=data,
+        upsert=True
+    )
+
+
+def _thumbnail(data, size):
+    img = Image.open(io.BytesIO(data))
+    img.thumbnail((size, size))
+    if img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB')
+    out = io.BytesIO()
+    img.save(out, format='JPEG', quality=80, optimize=True)
+    return out.getvalue()
+
+
+def detect_image_type(data):
+    """MIME type of an accepted image format, or raise ValueError; the client's declared type is never trusted."""
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            fmt = img.format
+            img.verify()
+    except Exception:
+        raise ValueError("Upload is not a readable image")
+    if fmt not in IMAGE_TYPES:
+        raise ValueError(f"Unsupported image format {fmt}; use JPEG, PNG, GIF or WebP")
+    return IMAGE_TYPES[fmt]
+
+
+def store_image(data):
+    """Store an image once by content hash and return its /uploads/ URL; ValueError if it is not one."""
+    content_type = detect_image_type(data)
+    digest = hashlib.sha256(data).hexdigest()
+    if not Blob.objects(key=digest).only('key').first():
+        _put(digest, data, content_type)
+        try:
+            for size in THUMBNAIL_SIZES:
+                _put(f"{digest}_{size}", _thumbnail(data, size), 'image/jpeg')
+        except Exception as e:
+            # Verified but not fully decodable (e.g. truncated): only the original
+            # is kept and thumbnail URLs fall back to it in send_blob()
+            print(f"Thumbnail generation skipped for {digest}: {e}")
+    return UPLOAD_PREFIX + digest
+
+
+def thumbnail_url(image_url, size=CATALOG_THUMBNAIL):
+    """Thumbnail URL for a stored image; legacy data URIs pass through unchanged."""
+    if image_url and image_url.startswith(UPLOAD_PREFIX):
+        return f"{image_url}_{size}"
+    return image_url
+
+
+def decode_data_uri(uri):
+    """Split a 'data:<mime>;base64,<payload>' URI into (bytes, mime)."""
+    import base64
+    header, _, payload = uri.partition(',')
+    mime = header[len('data:'):].split(';')[0] or 'image/jpeg'
+    return base64.b64decode(payload), mime
+
+
+def send_blob(key):
+    """Serve a blob with a strong ETag; returns None if the key is unknown."""
+    # Content-addressed keys never change, so a matching ETag needs no lookup
+    if request.if_none_match.contains(key):
+        response = make_response('', 304)
+    else:
+        blob = Blob.objects(key=key).first()
+        if not blob and '_' in key:
+            # Missing thumbnail (e.g. undecodable upload): fall back to the original
+            blob = Blob.objects(key=key.split('_', 1)[0]).first()
+        if not blob:
+            return None
+        response = make_response(blob.data)
+        # Blobs stored before uploads were sniffed may carry a client-chosen type
+        content_type = blob.content_type
+        response.headers['Content-Type'] = content_type if content_type in IMAGE_TYPES.values() \
+            else 'application/octet-stream'
+    # Never let a browser reinterpret a blob as HTML or script
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    response.set_etag(key)
+    response.headers['Cache-Control'] = f'public, max-age={CACHE_MAX_AGE}, immutable'
+    return response
+
+
+def is_blob_key(filename):
+    digest = filename.split('_', 1)[0]
+    return len(digest) == 64 and all(c in '0123456789abcdef' for c in digest)
@@ -0,0 +1,65 @@
+from flask import request, make_response
+from models import Counter
+from collections import OrderedDict
+from functools import wraps
+import hashlib
+import threading
+
+CATALOG = 'catalog'
+MAX_ENTRIES = 256
+
+# Per-worker response cache keyed by (name, generation, full path); entries
+# from older generations are simply never hit again and age out of the LRU
+_entries = OrderedDict()
+_lock = threading.Lock()
+
+
+def generation(name):
+    counter = Counter.objects(name=name).only('value').first()
+    return counter.value if counter else 0
+
+
+def invalidate(name):
+    """Bump the shared generation so every worker drops its cached responses; returns the new one."""
+    return Counter.objects(name=name).modify(inc__value=1, upsert=True, new=True).value
+
+
+def versioned_cache(name):
+    """
+    Cache a GET view's 200 responses per generation of `name` and serve strong
+    ETags, answering If-None-Match revalidations with 304 without running the view.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            gen = generation(name)
+            path = request.full_path
+            etag = f"{name}-{gen}-{hashlib.sha1(path.encode()).hexdigest()[:16]}"
+
+            # Weak comparison: compressed responses carry the tag as W/"..."
+            if request.if_none_match.contains_weak(etag):
+                response = make_response('', 304)
+            else:
+                key = (name, gen, path)
+                with _lock:
+                    entry = _entries.get(key)
+                    if entry is not None:
+                        _entries.move_to_end(key)
+                if entry is None:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    entry = (response.get_data(), response.mimetype)
+                    with _lock:
+                        _entries[key] = entry
+                        while len(_entries) > MAX_ENTRIES:
+                            _entries.popitem(last=False)
+                response = make_response(entry[0])
+                response.mimetype = entry[1]
+
+            response.set_etag(etag)
+            # Clients may keep the body but must revalidate before reusing it
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,77 @@
+"""
+Query-plan regression check: explains the query behind each hot route and
+exits non-zero if any of them falls back to a collection scan.
+
+    cd backend && MONGO_URI=mongodb://localhost/agri_bench python check_query_plans.py
+
+Declared indexes are created first, so MONGO_URI must name a scratch
+database (its name has to contain "bench"), e.g. one filled by
+benchmarks.seed; the check refuses to run anywhere else.
+"""
+from models import User, Product, Order, Tombstone
+from indexes import ensure_indexes
+from benchmarks.run import require_scratch_database
+from mongoengine import connect
+from bson import ObjectId
+from datetime import datetime
+import os
+import sys
+from dotenv import load_dotenv
+import certifi
+
+load_dotenv()
+ca = certifi.where()
+connect(host=os.getenv('MONGO_URI'), tlsCAFile=ca)
+require_scratch_database()
+ensure_indexes()
+
+some_id = ObjectId()
+
+# Route -> the find() it issues. Aggregations are not explained; entries marked
+# "stats" stand in for a pipeline with a find() on its leading $match, the only
+# stage that can use an index.
+FIND_QUERIES = {
+    "get_buyer_products": Product.objects(status='approved', quantity__gt=0).order_by('-created_at', '-id').limit(51),
+    "get_buyer_products (next page)": Product.objects(status='approved', quantity__gt=0, created_at__lt=datetime.utcnow())
+        .order_by('-created_at', '-id').limit(51),
+    "get_pending_products": Product.objects(status='pending').order_by('-created_at'),
+    "get_my_products": Product.objects(farmer=some_id),
+    "get_my_products (since)": Product.objects(farmer=some_id, updated_at__gte=datetime.utcnow()).order_by('updated_at'),
+    "get_pending_products (since)": Product.objects(updated_at__gte=datetime.utcnow()).order_by('updated_at'),
+    "get_admin_stats (recent listings)": Product.objects.order_by('-created_at').limit(10),
+    "get_admin_stats (recent orders)": Order.objects.order_by('-created_at').limit(10),
+    "get_all_users": User.objects(role__ne='admin').order_by('-id').limit(51),
+    "get_all_users (role)": User.objects(role='farmer').order_by('-id').limit(51),
+    "get_all_users (farmer stats)": Product.objects(farmer__in=[some_id]),
+    "get_all_users (buyer stats)": Order.objects(buyer__in=[some_id]),
+    "get_all_transactions": Order.objects.order_by('-created_at'),
+    "login": User.objects(email='someone@example.com'),
+    "delta sync (tombstones)": Tombstone.objects(farmer=some_id, deleted_at__gte=datetime.utcnow()),
+}
+
+
+def stages(plan):
+    """Yield every stage name in an explain() plan tree."""
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            yield plan['stage']
+        for value in plan.values():
+            yield from stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from stages(value)
+
+
+failures = []
+for route, queryset in FIND_QUERIES.items():
+    winning = queryset.explain()['queryPlanner']['winningPlan']
+    used = set(stages(winning))
+    status = "❌ COLLSCAN" if 'COLLSCAN' in used else "✅"
+    if 'COLLSCAN' in used:
+        failures.append(route)
+    print(f"  {status} {route}: {' <- '.join(stages(winning))}")
+
+if failures:
+    print(f"\n❌ {len(failures)} queries fall back to a collection scan: {', '.join(failures)}")
+    sys.exit(1)
+print("\n✅ All route queries use an index")
@@ -0,0 +1,106 @@
+from flask import request
+from collections import OrderedDict
+import gzip
+import os
+import threading
+import zlib
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip only without it
+    brotli = None
+
+# Below this a compressed body saves less than the headers and CPU cost
+MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+# Mid levels: most of the ratio for a fraction of the CPU of the maximum
+GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', 5))
+COMPRESSIBLE = {'application/json', 'application/x-ndjson', 'text/csv', 'text/plain', 'text/html',
+                'text/css', 'application/javascript'}
+# Compressed bodies of responses with a strong ETag, reused on cache hits
+CACHE_ENTRIES = 256
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def gzip_bytes(data):
+    return gzip.compress(data, GZIP_LEVEL, mtime=0)
+
+
+def brotli_bytes(data):
+    return brotli.compress(data, quality=BROTLI_QUALITY)
+
+
+def _gzip_stream(chunks):
+    z = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        out = z.compress(chunk)
+        if out:
+            yield out
+    yield z.flush()
+
+
+def _brotli_stream(chunks):
+    z = brotli.Compressor(quality=BROTLI_QUALITY)
+    for chunk in chunks:
+        out = z.process(chunk)
+        if out:
+            yield out
+    yield z.finish()
+
+
+# Server preference order, used when the client rates both equally
+ENCODINGS = {'gzip': (gzip_bytes, _gzip_stream)}
+if brotli is not None:
+    ENCODINGS = {'br': (brotli_bytes, _brotli_stream), **ENCODINGS}
+
+
+def _encode(encoding, data, etag):
+    if not etag:
+        return ENCODINGS[encoding][0](data)
+    key = (etag, encoding)
+    with _lock:
+        body = _cache.get(key)
+        if body is not None:
+            _cache.move_to_end(key)
+            return body
+    body = ENCODINGS[encoding][0](data)
+    with _lock:
+        _cache[key] = body
+        while len(_cache) > CACHE_ENTRIES:
+            _cache.popitem(last=False)
+    return body
+
+
+def compress_response(response):
+    """after_request hook: compress text bodies with the best encoding the client accepts."""
+    if (response.mimetype not in COMPRESSIBLE or response.status_code < 200
+            or response.status_code in (204, 304) or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(list(ENCODINGS))
+    if not encoding:
+        return response
+
+    etag, weak = response.get_etag()
+    if response.is_streamed:
+        # Exports: compress as rows are produced; the length is unknown anyway
+        response.response = ENCODINGS[encoding][1](response.iter_encoded())
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < MIN_SIZE:
+            return response
+        response.set_data(_encode(encoding, data, None if weak else etag))
+
+    response.headers['Content-Encoding'] = encoding
+    if etag:
+        # The compressed bytes differ from the identity ones: the tag is now weak
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    app.after_request(compress_response)
+    return list(ENCODINGS)
@@ -1,4 +1,5 @@
 from models import User
+from snapshots import repair_users
 from mongoengine import connect
 import os
 from dotenv import load_dotenv
@@ -25,6 +26,7 @@ try:
         user.password = generate_password_hash(password)
         user.name = name # Ensure name is set
         user.save()
+        repair_users([(user.id, name)])  # Listings and orders show the new name
         print("✅ Admin updated successfully!")
     else:
         print(f"Creating new admin user {email}...")
@@ -0,0 +1,84 @@
+from mongoengine import connect
+from mongoengine.connection import get_db
+import certifi
+import os
+import pymongo
+import threading
+
+# Probes must answer well inside a load balancer's check timeout
+READINESS_TIMEOUT_S = 2
+# Per-process warm-up state; reset in forked children so each gunicorn worker
+# builds its own connection pool instead of inheriting the parent's
+_warmup = {'pid': None, 'thread': None, 'error': None}
+_lock = threading.Lock()
+
+
+def init_db(uri):
+    """
+    Register the Mongo connection without opening it. With connect=False no
+    sockets or monitor threads exist until the first query, which happens in
+    the worker after fork, so this is safe under gunicorn --preload.
+
+    A mongomock://host/db URI runs against an in-memory mongomock database
+    (benchmarks and local experiments; mongomock is not a runtime dependency).
+    """
+    if uri and uri.startswith('mongomock://'):
+        import mongomock
+        from models import Event
+        # mongomock has no capped collections; the event log becomes a plain one
+        Event._meta['max_documents'] = Event._meta['max_size'] = None
+        connect(host='mongodb://' + uri[len('mongomock://'):], mongo_client_class=mongomock.MongoClient,
+                uuidRepresentation='standard')
+        return
+    connect(
+        host=uri,
+        tlsCAFile=certifi.where(),
+        connect=False,
+        serverSelectionTimeoutMS=20000,
+        connectTimeoutMS=20000,
+        socketTimeoutMS=20000,
+        uuidRepresentation='standard'
+    )
+
+
+def _ensure_indexes():
+    from indexes import ensure_indexes
+    try:
+        missing = ensure_indexes()
+        _warmup['error'] = f"missing indexes: {missing}" if missing else None
+        if not missing:
+            print(f"✅ Worker {os.getpid()} connected to MongoDB, indexes verified")
+    except Exception as e:
+        _warmup['error'] = str(e)
+        print(f"⚠️ Worker {os.getpid()} could not reach MongoDB yet: {e}")
+
+
+def warm_up():
+    """Connect and verify indexes in the background, once per process."""
+    if _warmup['pid'] == os.getpid():
+        return
+    with _lock:
+        if _warmup['pid'] == os.getpid():
+            return
+        _warmup['pid'] = os.getpid()
+        _warmup['thread'] = threading.Thread(target=_ensure_indexes, name='mongo-warmup', daemon=True)
+        _warmup['thread'].start()
+
+
+def readiness():
+    """Return (ready, checks) for the readiness probe."""
+    from indexes import missing_indexes
+    checks = {}
+    with pymongo.timeout(READINESS_TIMEOUT_S):
+        try:
+            get_db().client.admin.command('ping')
+            checks['mongo'] = 'ok'
+        except Exception as e:
+            checks['mongo'] = f"unreachable: {e}"
+            return False, checks
+        try:
+            missing = missing_indexes()
+            checks['indexes'] = 'ok' if not missing else f"missing: {missing}"
+        except Exception as e:
+            checks['indexes'] = f"unknown: {e}"
+    return all(v == 'ok' for v in checks.values()), checks
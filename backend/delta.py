@@ -0,0 +1,53 @@
+from models import Product, Tombstone, TOMBSTONE_RETENTION
+from datetime import datetime, timedelta
+import base64
+
+# Each sync re-reads this far behind its cursor, so writes still in flight
+# during the previous sync (or stamped by a worker whose clock lags) are not
+# missed; clients upsert by id, so the few repeats are harmless
+OVERLAP = timedelta(seconds=5)
+
+
+def now():
+    """utcnow truncated to MongoDB's millisecond precision."""
+    t = datetime.utcnow()
+    return t.replace(microsecond=t.microsecond // 1000 * 1000)
+
+
+def encode_since(at):
+    return base64.urlsafe_b64encode(at.isoformat().encode()).decode()
+
+
+def decode_since(cursor):
+    """Return the cursor's datetime or raise ValueError for a malformed cursor."""
+    try:
+        return datetime.fromisoformat(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def product_changes(since, scope, view, order_by='-created_at'):
+    """
+    Delta sync over products. `scope` narrows the products a client may see
+    (e.g. {'farmer': id}; tombstones are filtered by it too), `view` is the
+    equality filter of the list it shows (e.g. {'status': 'pending'}).
+
+    With a cursor, returns the products in scope written since it: those
+    still matching `view` as items, the rest plus deleted ones as removed
+    ids. Without a cursor, or one older than the tombstone retention, returns
+    the whole view with full=True. Returns (items, removed, next cursor, full).
+    """
+    started = now()
+    since_at = decode_since(since) if since else None
+    if since_at is None or since_at < started - TOMBSTONE_RETENTION:
+        return list(Product.objects(**scope, **view).order_by(order_by)), [], encode_since(started), True
+
+    after = since_at - OVERLAP
+    items, removed = [], []
+    for p in Product.objects(**scope, updated_at__gte=after).order_by('updated_at'):
+        if all(getattr(p, field) == value for field, value in view.items()):
+            items.append(p)
+        else:
+            removed.append(str(p.id))
+    removed += [str(t.doc_id) for t in Tombstone.objects(**scope, deleted_at__gte=after).only('doc_id')]
+    return items, removed, encode_since(started), False
@@ -0,0 +1,160 @@
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from models import Event
+from auth import requires_role, current_identity
+from bson import ObjectId
+from pymongo import CursorType
+from datetime import datetime
+import json
+import os
+import queue
+import threading
+import time
+
+ADMINS = 'role:admin'
+POLL_INTERVAL_S = 0.5
+SUBSCRIBER_QUEUE_SIZE = 100
+HEARTBEAT_S = 15
+# Streams end after this long; EventSource reconnects with Last-Event-ID
+STREAM_MAX_S = 300
+# Open streams per process. Under gthread each one holds a request thread, so
+# the API app keeps this well below --threads; events_app.py (gevent) raises it.
+MAX_STREAMS = int(os.getenv('MAX_STREAMS', 4))
+
+
+def publish(event_type, audience, data):
+    """Record an event for the given user ids / 'role:<role>' audiences (best effort)."""
+    audience = sorted({str(a) for a in audience if a})
+    if not audience:
+        return
+    try:
+        Event(audience=audience, type=event_type, data=data).save()
+    except Exception as e:
+        # The write that triggered the event already succeeded; never fail it here
+        print(f"⚠️ Could not publish {event_type} event: {e}")
+
+
+class Broker:
+    """
+    Per-worker fan-out. One daemon thread follows the capped Event collection
+    with a tailable cursor (falling back to polling where tailing is not
+    supported) and hands each event to the matching local subscribers.
+    """
+
+    def __init__(self):
+        self.subscribers = {}  # queue -> set of audience keys
+        self.lock = threading.Lock()
+        self.pid = None
+
+    def _ensure_started(self):
+        # Threads do not survive fork: start one per worker process
+        if self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid != os.getpid():
+                self.pid = os.getpid()
+                self.subscribers = {}
+                threading.Thread(target=self._follow, name='event-broker', daemon=True).start()
+
+    def subscribe(self, keys):
+        """A queue receiving events for `keys`, or None if MAX_STREAMS are already open."""
+        self._ensure_started()
+        q = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self.lock:
+            if len(self.subscribers) >= MAX_STREAMS:
+                return None
+            self.subscribers[q] = set(keys)
+        return q
+
+    def unsubscribe(self, q):
+        with self.lock:
+            self.subscribers.pop(q, None)
+
+    def _dispatch(self, doc):
+        audience = set(doc.get('audience', []))
+        with self.lock:
+            targets = [q for q, keys in self.subscribers.items() if keys & audience]
+        for q in targets:
+            try:
+                q.put_nowait(doc)
+            except queue.Full:
+                pass  # A stalled client misses events; it refetches on reconnect
+
+    def _follow(self):
+        collection = Event._get_collection()
+        last = collection.find_one(sort=[('_id', -1)], projection={'_id': 1})
+        last_id = last['_id'] if last else ObjectId.from_datetime(datetime.utcnow())
+        while True:
+            try:
+                cursor = collection.find({'_id': {'$gt': last_id}}, cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive:
+                    for doc in cursor:
+                        last_id = doc['_id']
+                        self._dispatch(doc)
+                    time.sleep(0.05)
+                # Tailable cursors die on an empty collection; wait before reopening
+                time.sleep(POLL_INTERVAL_S)
+            except (NotImplementedError, TypeError):
+                # No tailable cursors (e.g. mongomock): poll instead
+                for doc in collection.find({'_id': {'$gt': last_id}}).sort('_id', 1):
+                    last_id = doc['_id']
+                    self._dispatch(doc)
+                time.sleep(POLL_INTERVAL_S)
+            except Exception as e:
+                print(f"⚠️ Event broker error, retrying: {e}")
+                time.sleep(1)
+
+
+broker = Broker()
+
+
+def _format(doc):
+    payload = json.dumps({**doc.get('data', {}), "at": doc['created_at'].isoformat()})
+    return f"id: {doc['_id']}\nevent: {doc['type']}\ndata: {payload}\n\n"
+
+
+def _frames(q, keys, last_event_id):
+    try:
+        yield "retry: 3000\n\n"
+        replayed = None
+        if last_event_id and ObjectId.is_valid(last_event_id):
+            # Replay what was missed while reconnecting, from the capped log
+            missed = Event._get_collection().find(
+                {'_id': {'$gt': ObjectId(last_event_id)}, 'audience': {'$in': list(keys)}}).sort('_id', 1)
+            for doc in missed:
+                replayed = doc['_id']
+                yield _format(doc)
+        deadline = time.monotonic() + STREAM_MAX_S
+        while time.monotonic() < deadline:
+            try:
+                doc = q.get(timeout=HEARTBEAT_S)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+            if replayed is None or doc['_id'] > replayed:
+                yield _format(doc)
+    finally:
+        broker.unsubscribe(q)
+
+
+events_api = Blueprint('events', __name__)
+
+
+@events_api.route('/api/events/stream', methods=['GET'])
+@requires_role(locations=['query_string', 'headers'])
+def event_stream():
+    # Server-Sent Events; EventSource cannot set headers, so ?jwt=<token> is accepted here only
+    identity = current_identity()
+    keys = {identity.id, f"role:{identity.role}"}
+    q = broker.subscribe(keys)
+    if q is None:
+        response = jsonify({"msg": "Too many open streams, try again shortly"})
+        response.headers['Retry-After'] = str(HEARTBEAT_S)
+        return response, 503
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    response = Response(stream_with_context(_frames(q, keys, last_event_id)), mimetype='text/event-stream')
+    # Also covers a client gone before the first frame, when the generator's finally never runs
+    response.call_on_close(lambda: broker.unsubscribe(q))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
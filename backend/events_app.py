@@ -0,0 +1,45 @@
+"""
+Notification streams only, for a gevent worker where an open stream costs a
+greenlet instead of a request thread:
+
+    cd backend && gunicorn events_app:app --worker-class gevent --worker-connections 1000
+
+Each worker holds up to MAX_STREAMS (default 900 here) open streams and
+answers 503 beyond that; the rest of its connections are left for
+reconnects and health checks. The API app (app.py) keeps its own small
+cap so streams can never take all of its threads.
+"""
+import os
+os.environ.setdefault('MAX_STREAMS', '900')  # Read by events at import
+
+from flask import Flask
+from flask_cors import CORS
+from extensions import jwt
+from database import init_db
+from dotenv import load_dotenv
+from datetime import timedelta
+
+load_dotenv()
+
+
+def create_events_app():
+    app = Flask(__name__)
+    CORS(app, resources={r"/*": {"origins": "*", "methods": ["GET", "OPTIONS"], "allow_headers": "*"}})
+    init_db(os.getenv('MONGO_URI'))
+    # Must match app.py so the API's tokens are accepted
+    app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'default-key')
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(days=7)
+    app.config['JWT_TOKEN_LOCATION'] = ['headers']
+    jwt.init_app(app)
+
+    from events import events_api
+    app.register_blueprint(events_api)
+
+    @app.route('/healthz')
+    def healthz():
+        return {"status": "ok"}
+
+    return app
+
+
+app = create_events_app()
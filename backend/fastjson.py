@@ -0,0 +1,45 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional: the stock provider is used without it
+    orjson = None
+
+# Datetimes go through default() so they render exactly as with the stock
+# provider (HTTP dates); non-string keys are stringified like json.dumps does
+_OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    DefaultJSONProvider with orjson doing the work. Output is the same JSON
+    (keys are not sorted, NaN becomes null); calls with extra json.dumps
+    keyword arguments fall back to the stock implementation.
+    """
+
+    def _options(self):
+        compact = self.compact if self.compact is not None else not self._app.debug
+        return _OPTIONS if compact else _OPTIONS | orjson.OPT_INDENT_2
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Hand the encoded bytes straight to the response, skipping a str round trip
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self._options())
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_json(app):
+    """Use orjson for jsonify/request.get_json when it is installed."""
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+    return type(app.json).__name__
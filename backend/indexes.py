@@ -0,0 +1,29 @@
+from models import User, Product, Order, Blob, Counter, DailyStat, Tombstone, PriceBar
+
+INDEXED_MODELS = (User, Product, Order, Blob, Counter, DailyStat, Tombstone, PriceBar)
+
+
+def _key(spec):
+    return tuple((field, direction) for field, direction in spec)
+
+
+def missing_indexes(models=INDEXED_MODELS):
+    """Return {collection: [index keys]} for declared indexes not present in Mongo."""
+    missing = {}
+    for model in models:
+        present = {_key(info['key']) for info in model._get_collection().index_information().values()}
+        declared = [_key(spec['fields']) for spec in model._meta['index_specs']]
+        absent = [spec for spec in declared if spec not in present]
+        if absent:
+            missing[model._get_collection_name()] = absent
+    return missing
+
+
+def ensure_indexes(models=INDEXED_MODELS):
+    """Create any declared indexes (a no-op when they exist) and verify them."""
+    for model in models:
+        model.ensure_indexes()
+    missing = missing_indexes(models)
+    if missing:
+        print(f"⚠️ Missing indexes after ensure_indexes: {missing}")
+    return missing
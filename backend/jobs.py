@@ -0,0 +1,73 @@
+from models import QualityJob
+from quality import score_image
+from pools import ProcessPool
+from datetime import datetime, timedelta
+import hashlib
+import os
+
+QUALITY_WORKERS = int(os.getenv('QUALITY_WORKERS', 2))
+# A queued job older than this is assumed lost (e.g. worker restart) and resubmitted
+STALE_AFTER = timedelta(minutes=5)
+
+_pool = ProcessPool(QUALITY_WORKERS)
+
+
+def _finish(digest, future):
+    # Runs on a pool callback thread in the web worker, which owns the Mongo connection
+    try:
+        result = future.result()
+        QualityJob.objects(digest=digest).update_one(
+            set__status='done', set__score=result['score'], set__confidence=result['confidence'],
+            set__grade=result['grade'], set__finished_at=datetime.utcnow())
+    except Exception as e:
+        QualityJob.objects(digest=digest).update_one(
+            set__status='failed', set__error=str(e), set__finished_at=datetime.utcnow())
+
+
+def _run(digest, data):
+    try:
+        future = _pool.submit(score_image, data)
+    except Exception as e:
+        # Marked failed rather than left queued, so the next submit retries it
+        QualityJob.objects(digest=digest).update_one(
+            set__status='failed', set__error=str(e), set__finished_at=datetime.utcnow())
+        return
+    future.add_done_callback(lambda f: _finish(digest, f))
+
+
+def submit_quality_job(data, vegetable_name):
+    """
+    Queue an analysis for an image and return its job without waiting.
+    Identical images share one job; failed or stale jobs are retried.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    existing = QualityJob.objects(digest=digest).modify(
+        upsert=True, new=False,
+        set_on_insert__vegetable_name=vegetable_name,
+        set_on_insert__status='queued',
+        set_on_insert__created_at=datetime.utcnow())
+    if existing is None:
+        _run(digest, data)
+    else:
+        # Only one caller wins the conditional reset, so a retry is submitted once
+        retried = QualityJob.objects(digest=digest, status='failed').modify(
+            set__status='queued', set__created_at=datetime.utcnow()) or \
+            QualityJob.objects(digest=digest, status='queued', created_at__lt=datetime.utcnow() - STALE_AFTER).modify(
+                set__created_at=datetime.utcnow())
+        if retried:
+            _run(digest, data)
+    return QualityJob.objects(digest=digest).first()
+
+
+def job_result(job):
+    result = {"job_id": job.digest, "status": job.status}
+    if job.status == 'done':
+        veg_name = job.vegetable_name or 'vegetable'
+        if job.grade == "Rejected":
+            analysis_msg = "AI Analysis detected potential defects. Low quality score."
+        else:
+            analysis_msg = f"Verified as {veg_name} (Confidence: {int(job.confidence * 100)}%). Matches export standards."
+        result.update({"score": job.score, "grade": job.grade, "analysis": analysis_msg})
+    elif job.status == 'failed':
+        result["msg"] = "Image could not be analysed"
+    return result
@@ -0,0 +1,74 @@
+from flask import current_app
+from models import Order
+from datetime import datetime, timedelta
+import csv
+import io
+
+EXPORT_BATCH_SIZE = 500
+EXPORT_COLUMNS = ["id", "buyer", "product", "farmer", "quantity", "amount", "payment_method", "status", "date"]
+
+
+def parse_date_range(args):
+    """Read ?from=YYYY-MM-DD&to=YYYY-MM-DD (both inclusive); raises ValueError."""
+    start = args.get('from')
+    end = args.get('to')
+    start = datetime.strptime(start, "%Y-%m-%d") if start else None
+    end = datetime.strptime(end, "%Y-%m-%d") + timedelta(days=1) if end else None
+    return start, end
+
+
+def _query(start, end):
+    query = {}
+    if start or end:
+        query['created_at'] = {}
+        if start: query['created_at']['$gte'] = start
+        if end: query['created_at']['$lt'] = end
+    return query
+
+
+def transaction_rows(start=None, end=None):
+    """Yield ledger rows newest-first; names come from the order's own snapshots, no joins."""
+    cursor = Order._get_collection().find(_query(start, end), {
+        'buyer_name': 1, 'product_name': 1, 'farmer_name': 1, 'quantity': 1, 'total_price': 1,
+        'payment_method': 1, 'status': 1, 'created_at': 1
+    }).sort('created_at', -1).batch_size(EXPORT_BATCH_SIZE)
+    for o in cursor:
+        yield {
+            "id": str(o['_id']),
+            "buyer": o.get('buyer_name') or "Unknown",
+            "product": o.get('product_name') or "Unknown",
+            "farmer": o.get('farmer_name') or "Unknown",
+            "quantity": o['quantity'],
+            "amount": o['total_price'],
+            "payment_method": o['payment_method'],
+            "status": o.get('status', 'completed'),
+            "date": o['created_at'].strftime("%Y-%m-%d %H:%M")
+        }
+
+
+def stream_ndjson(rows):
+    dumps = current_app.json.dumps
+    for row in rows:
+        yield dumps(row) + "\n"
+
+
+def _cell(value):
+    # Names are user-entered; a leading =, +, -, @ (or tab/CR) would run as a
+    # spreadsheet formula when the export is opened, so quote it as text
+    if isinstance(value, str) and value[:1] in ('=', '+', '-', '@', '\t', '\r'):
+        return "'" + value
+    return value
+
+
+def stream_csv(rows):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow({k: _cell(v) for k, v in row.items()})
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    # Header only when there are no rows
+    if buf.getvalue():
+        yield buf.getvalue()
@@ -0,0 +1,88 @@
+from models import Product
+from snapshots import user_name
+from bson import ObjectId
+import csv
+import io
+import math
+import json
+
+MIN_QUANTITY_KG = 10
+INSERT_CHUNK_SIZE = 500
+MAX_BULK_ROWS = 5000
+
+# Pricing Logic
+def calculate_price(farmer_price_per_kg, quantity):
+    platform_fee_percent = 0.15
+    platform_fee_per_kg = farmer_price_per_kg * platform_fee_percent
+    farmer_earnings_per_kg = farmer_price_per_kg - platform_fee_per_kg
+    return farmer_earnings_per_kg, platform_fee_per_kg * quantity
+
+
+def status_for(quality_score):
+    return 'approved' if quality_score > 60 else 'pending'
+
+
+def parse_rows(body, content_type):
+    """Rows from a JSON array (or {"items": [...]}) or a CSV document with a header row."""
+    if 'csv' in content_type:
+        return list(csv.DictReader(io.StringIO(body.decode('utf-8-sig'))))
+    data = json.loads(body)
+    rows = data.get('items') if isinstance(data, dict) else data
+    if not isinstance(rows, list):
+        raise ValueError("Expected a JSON array of listings")
+    return rows
+
+
+def build_listing(farmer_id, row, farmer_name=None):
+    """Validate one row and return (Product, None) or (None, error message)."""
+    if not isinstance(row, dict):
+        return None, "Row must be an object"
+    veg_name = (row.get('vegetable_name') or '').strip()
+    if not veg_name:
+        return None, "vegetable_name is required"
+    try:
+        price = float(row.get('price'))
+        qty = float(row.get('quantity'))
+        quality_score = float(row.get('quality_score') or 0)
+    except (TypeError, ValueError):
+        return None, "price, quantity and quality_score must be numbers"
+    # float() accepts 'nan' and 'inf', and NaN slips past every comparison below
+    if not all(math.isfinite(v) for v in (price, qty, quality_score)):
+        return None, "price, quantity and quality_score must be finite numbers"
+    if price <= 0:
+        return None, "price must be positive"
+    if qty < MIN_QUANTITY_KG:
+        return None, f"Min quantity {MIN_QUANTITY_KG}kg"
+
+    earnings, _ = calculate_price(price, qty)
+    return Product(
+        farmer=farmer_id,
+        farmer_name=farmer_name,
+        vegetable_name=veg_name,
+        market_price=price,
+        farmer_earnings=earnings,
+        quantity=qty,
+        image_url="",
+        status=status_for(quality_score)
+    ), None
+
+
+def import_listings(farmer_id, rows):
+    """
+    Validate every row in one pass, then insert the valid ones with
+    insert_many in chunks. Returns (inserted products, [{"row", "msg"}]).
+    Row numbers are 1-based data rows.
+    """
+    farmer_id = ObjectId(farmer_id)
+    farmer_name = user_name(farmer_id)
+    products, errors = [], []
+    for number, row in enumerate(rows, start=1):
+        product, error = build_listing(farmer_id, row, farmer_name)
+        if error:
+            errors.append({"row": number, "msg": error})
+        else:
+            products.append(product)
+
+    for start in range(0, len(products), INSERT_CHUNK_SIZE):
+        Product.objects.insert(products[start:start + INSERT_CHUNK_SIZE], load_bulk=False)
+    return products, errors
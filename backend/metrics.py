@@ -0,0 +1,170 @@
+from flask import request, g
+from pymongo import monitoring
+from collections import defaultdict
+import json
+import os
+import tempfile
+import threading
+import time
+
+# Requests issuing more Mongo commands than this are flagged as likely N+1
+QUERY_ALERT_THRESHOLD = int(os.getenv('QUERY_ALERT_THRESHOLD', 25))
+# Each worker writes its totals here; /metrics sums every worker's file
+METRICS_DIR = os.getenv('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'agrimarket-metrics'))
+FLUSH_INTERVAL_S = 1.0
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+QUERY_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250)
+
+HISTOGRAMS = {
+    'http_request_duration_seconds': ("Request latency by route", LATENCY_BUCKETS),
+    'http_response_size_bytes': ("Response body size by route", SIZE_BUCKETS),
+    'http_request_mongo_commands': ("MongoDB commands issued per request", QUERY_BUCKETS),
+}
+COUNTERS = {
+    'http_requests_total': "Requests by route, method and status",
+    'http_requests_query_alerts_total': f"Requests issuing more than {QUERY_ALERT_THRESHOLD} MongoDB commands",
+    'mongo_commands_total': "MongoDB commands by command name",
+}
+
+_local = threading.local()
+_lock = threading.Lock()
+# name -> {labels tuple: value} for counters; name -> {labels: [bucket counts..., sum, count]}
+_counters = defaultdict(lambda: defaultdict(float))
+_histograms = defaultdict(dict)
+_last_flush = [0.0]
+
+
+class _CommandCounter(monitoring.CommandListener):
+    """Counts commands per request thread; pymongo calls started() on the issuing thread."""
+
+    def started(self, event):
+        if getattr(_local, 'commands', None) is not None:
+            _local.commands += 1
+        with _lock:
+            _counters['mongo_commands_total'][(('command', event.command_name),)] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def _observe(name, labels, value):
+    buckets = HISTOGRAMS[name][1]
+    row = _histograms[name].setdefault(labels, [0] * (len(buckets) + 2))
+    for i, bound in enumerate(buckets):
+        if value <= bound:
+            row[i] += 1
+    row[-2] += value
+    row[-1] += 1
+
+
+def _flush(force=False):
+    now = time.monotonic()
+    if not force and now - _last_flush[0] < FLUSH_INTERVAL_S:
+        return
+    _last_flush[0] = now
+    with _lock:
+        snapshot = {
+            'counters': {n: [[list(l), v] for l, v in rows.items()] for n, rows in _counters.items()},
+            'histograms': {n: [[list(l), r] for l, r in rows.items()] for n, rows in _histograms.items()},
+        }
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    path = os.path.join(METRICS_DIR, f"{os.getpid()}.json")
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(tmp, path)
+
+
+def _before():
+    _local.commands = 0
+    g.metrics_started = time.perf_counter()
+
+
+def _after(response):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    commands = _local.commands
+    _local.commands = None
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    labels = (('route', route), ('method', request.method))
+
+    with _lock:
+        _counters['http_requests_total'][labels + (('status', str(response.status_code)),)] += 1
+        _observe('http_request_duration_seconds', labels, elapsed)
+        _observe('http_request_mongo_commands', labels, commands)
+        # Streamed bodies (exports, SSE) have no length up front
+        if not response.is_streamed:
+            _observe('http_response_size_bytes', labels, response.calculate_content_length() or 0)
+        if commands > QUERY_ALERT_THRESHOLD:
+            _counters['http_requests_query_alerts_total'][labels] += 1
+    if commands > QUERY_ALERT_THRESHOLD:
+        print(f"⚠️ Possible N+1: {request.method} {request.path} issued {commands} MongoDB commands in {elapsed * 1000:.0f}ms")
+    _flush()
+    return response
+
+
+def instrument(blueprint):
+    """Time every request to the blueprint and count its MongoDB commands."""
+    blueprint.before_request(_before)
+    blueprint.after_request(_after)
+
+
+def command_totals():
+    """{(route, method): (MongoDB commands, requests)} recorded by this worker so far."""
+    with _lock:
+        return {(dict(labels)['route'], dict(labels)['method']): (row[-2], row[-1])
+                for labels, row in _histograms['http_request_mongo_commands'].items()}
+
+
+def _label_text(labels, extra=()):
+    parts = [f'{k}="{v}"' for k, v in list(labels) + list(extra)]
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def render():
+    """Prometheus text exposition summed over every worker's snapshot."""
+    _flush(force=True)
+    counters = defaultdict(lambda: defaultdict(float))
+    histograms = defaultdict(dict)
+    for filename in os.listdir(METRICS_DIR):
+        if not filename.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(METRICS_DIR, filename)) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for name, rows in snapshot['counters'].items():
+            for labels, value in rows:
+                counters[name][tuple(map(tuple, labels))] += value
+        for name, rows in snapshot['histograms'].items():
+            for labels, row in rows:
+                key = tuple(map(tuple, labels))
+                total = histograms[name].get(key)
+                histograms[name][key] = row if total is None else [a + b for a, b in zip(total, row)]
+
+    lines = []
+    for name, help_text in COUNTERS.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for labels, value in sorted(counters[name].items()):
+            lines.append(f"{name}{_label_text(labels)} {value:g}")
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for labels, row in sorted(histograms[name].items()):
+            for bound, count in zip(buckets, row):
+                lines.append(f"{name}_bucket{_label_text(labels, [('le', f'{bound:g}')])} {count}")
+            lines.append(f"{name}_bucket{_label_text(labels, [('le', '+Inf')])} {row[-1]}")
+            lines.append(f"{name}_sum{_label_text(labels)} {row[-2]:g}")
+            lines.append(f"{name}_count{_label_text(labels)} {row[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+# Listeners must be registered before the MongoClient is created
+monitoring.register(_CommandCounter())
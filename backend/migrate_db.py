@@ -1,36 +1,34 @@
 from models import User, Product, Order
+from migrations import run_migrations, MIGRATIONS
 from mongoengine import connect
+import argparse
 import os
 from dotenv import load_dotenv
 import certifi
 
+parser = argparse.ArgumentParser(description="Apply pending data migrations (interrupted runs resume from their checkpoint).")
+parser.add_argument('names', nargs='*', help=f"only these migrations: {', '.join(n for n, _ in MIGRATIONS)}")
+parser.add_argument('--rerun', nargs='+', default=[], metavar='NAME', help="reset and run these again")
+args = parser.parse_args()
+
 load_dotenv()
 ca = certifi.where()
 connect(host=os.getenv('MONGO_URI'), tlsCAFile=ca)
 
 print("🔧 Starting database migration...")
-
-# Fix all products without status field
-products_updated = 0
-for product in Product.objects():
-    if not hasattr(product, 'status') or product.status is None:
-        product.status = 'pending'
-        product.save()
-        products_updated += 1
-        print(f"  ✅ Updated product: {product.vegetable_name}")
-
-print(f"\n✅ Migration complete! Updated {products_updated} products")
+run_migrations(only=args.names or None, rerun=args.rerun)
+print("\n✅ Migration complete!")
 
 # Show summary
-total_products = Product.objects.count()
-total_users = User.objects.count()
-total_orders = Order.objects.count()
+by_status = {row['_id']: row['count'] for row in Product.objects.aggregate([
+    {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+])}
 
 print(f"\n📊 Database Summary:")
-print(f"  Users: {total_users}")
-print(f"  Products: {total_products}")
-print(f"  Orders: {total_orders}")
+print(f"  Users: {User.objects.count()}")
+print(f"  Products: {sum(by_status.values())}")
+print(f"  Orders: {Order.objects.count()}")
 print(f"\n  Products by status:")
-print(f"    Pending: {Product.objects(status='pending').count()}")
-print(f"    Approved: {Product.objects(status='approved').count()}")
-print(f"    Refused: {Product.objects(status='refused').count()}")
+print(f"    Pending: {by_status.get('pending', 0)}")
+print(f"    Approved: {by_status.get('approved', 0)}")
+print(f"    Refused: {by_status.get('refused', 0)}")
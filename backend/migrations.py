@@ -0,0 +1,193 @@
+from models import User, Product, Order, DailyStat, MigrationRecord
+from pagination import names_by_id
+from prices import rebuild_day
+from cache import invalidate, CATALOG
+from snapshots import repair_products, repair_users, product_rows, user_rows
+from blobstore import store_image, decode_data_uri
+from pymongo import UpdateOne
+from bson import ObjectId
+from datetime import datetime, timedelta
+import time
+
+BATCH_SIZE = 1000
+
+# Registered migrations in the order they run
+MIGRATIONS = []
+
+
+def migration(name):
+    def register(fn):
+        MIGRATIONS.append((name, fn))
+        return fn
+    return register
+
+
+class Batches:
+    """Walks a collection in _id order in fixed-size batches, checkpointing after each."""
+
+    def __init__(self, record, batch_size=BATCH_SIZE):
+        self.record = record
+        self.batch_size = batch_size
+
+    def run(self, collection, query, make_ops, projection=None):
+        """
+        Apply make_ops(docs) -> [pymongo write ops] to every document matching
+        `query`, one bulk_write per batch (make_ops may also write directly and
+        return []). Resumes after record.checkpoint.
+        """
+        last_id = ObjectId(self.record.checkpoint) if self.record.checkpoint else None
+        started = time.perf_counter()
+        done_this_run = 0
+        while True:
+            batch_query = dict(query)
+            if last_id is not None:
+                batch_query['_id'] = {'$gt': last_id}
+            docs = list(collection.find(batch_query, projection).sort('_id', 1).limit(self.batch_size))
+            if not docs:
+                return
+            ops = make_ops(docs)
+            if ops:
+                collection.bulk_write(ops, ordered=False)
+            last_id = docs[-1]['_id']
+            done_this_run += len(docs)
+            MigrationRecord.objects(name=self.record.name).update_one(
+                set__checkpoint=str(last_id), inc__processed=len(docs))
+            rate = done_this_run / max(time.perf_counter() - started, 1e-9)
+            print(f"  ⏳ {self.record.name}: {self.record.processed + done_this_run} docs ({rate:,.0f} docs/s)")
+
+    def update_many(self, collection, query, update):
+        """Apply one update to every matching document: one update_many per batch of ids."""
+        def apply(docs):
+            collection.update_many({'_id': {'$in': [d['_id'] for d in docs]}}, update)
+            return []
+        self.run(collection, query, apply, projection={'_id': 1})
+
+
+@migration('0001_product_status_default')
+def product_status_default(batches):
+    batches.update_many(Product._get_collection(), {'status': None},
+                        {'$set': {'status': 'pending', 'updated_at': datetime.utcnow()}})
+
+
+@migration('0002_inline_images_to_blobs')
+def inline_images_to_blobs(batches):
+    def ops(docs):
+        result = []
+        for d in docs:
+            try:
+                data, _ = decode_data_uri(d['image_url'])
+                result.append(UpdateOne({'_id': d['_id']}, {'$set': {
+                    'image_url': store_image(data), 'updated_at': datetime.utcnow()}}))
+            except Exception as e:
+                print(f"  ⚠️ {d['_id']} skipped: {e}")
+        return result
+    # Small batches: every document carries a whole image
+    Batches(batches.record, batch_size=50).run(
+        Product._get_collection(), {'image_url': {'$regex': '^data:'}}, ops, projection={'image_url': 1})
+    # Cached catalog pages and every worker's search index still hold the data URIs
+    invalidate(CATALOG)
+
+
+@migration('0003_daily_stats_backfill')
+def daily_stats_backfill(batches):
+    # One server-side pass over orders; only the per-day totals come back. Days
+    # are replaced, so today is skipped: record_orders may be $inc-ing it while
+    # this runs. Rerun tomorrow to fill in the deployment day from its orders.
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    days = Order.objects.aggregate([
+        {"$match": {"created_at": {"$lt": today}}},
+        {"$group": {
+            "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+            "orders": {"$sum": 1},
+            "quantity": {"$sum": "$quantity"},
+            "revenue": {"$sum": "$total_price"}
+        }}
+    ])
+    ops = [UpdateOne({'_id': row['_id']}, {'$set': {
+        'orders': row['orders'], 'quantity': row['quantity'], 'revenue': row['revenue']}}, upsert=True)
+        for row in days]
+    if ops:
+        DailyStat._get_collection().bulk_write(ops, ordered=False)
+    print(f"  ⏳ 0003_daily_stats_backfill: {len(ops)} days")
+
+
+@migration('0004_product_updated_at')
+def product_updated_at(batches):
+    # Listings written before delta sync: last known change is their creation
+    def ops(docs):
+        return [UpdateOne({'_id': d['_id'], 'updated_at': None},
+                          {'$set': {'updated_at': d.get('created_at') or datetime.utcnow()}}) for d in docs]
+    batches.run(Product._get_collection(), {'updated_at': None}, ops, projection={'created_at': 1})
+
+
+@migration('0005_price_bars_backfill')
+def price_bars_backfill(batches):
+    # One UTC day at a time, checkpointing the day. Days are replaced, not
+    # incremented, so resuming or rerunning is safe. Today is left to the live
+    # updates; rerun tomorrow to fill in the deployment day from its orders.
+    record = batches.record
+    first = [doc.created_at for doc in (Order.objects.order_by('created_at').only('created_at').first(),
+                                        Product.objects.order_by('created_at').only('created_at').first()) if doc]
+    if not first:
+        return
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    day = datetime.strptime(record.checkpoint, "%Y-%m-%d") + timedelta(days=1) if record.checkpoint \
+        else min(first).replace(hour=0, minute=0, second=0, microsecond=0)
+    started = time.perf_counter()
+    done_this_run = 0
+    while day < today:
+        end = day + timedelta(days=1)
+        orders = list(Order._get_collection().find(
+            {'created_at': {'$gte': day, '$lt': end}},
+            {'product': 1, 'quantity': 1, 'total_price': 1, 'created_at': 1}))
+        names = names_by_id(Product, (o['product'] for o in orders), 'vegetable_name')
+        orders = [{**o, 'name': names[o['product']]} for o in orders if o['product'] in names]
+        products = Product.objects(created_at__gte=day, created_at__lt=end) \
+            .only('vegetable_name', 'market_price', 'quantity', 'status', 'created_at')
+        bars = rebuild_day(orders, products)
+        done_this_run += len(orders)
+        MigrationRecord.objects(name=record.name).update_one(
+            set__checkpoint=day.strftime("%Y-%m-%d"), inc__processed=len(orders))
+        if bars:
+            rate = done_this_run / max(time.perf_counter() - started, 1e-9)
+            print(f"  ⏳ {record.name}: {day:%Y-%m-%d} {bars} bars, {record.processed + done_this_run} orders ({rate:,.0f} orders/s)")
+        day = end
+
+
+@migration('0006_order_product_snapshots')
+def order_product_snapshots(batches):
+    # Orders learn their product's name and farmer (0007 needs the farmer)
+    def ops(docs):
+        repair_products(product_rows(docs))
+        return []
+    batches.run(Product._get_collection(), {}, ops, projection={'vegetable_name': 1, 'farmer': 1})
+
+
+@migration('0007_user_name_snapshots')
+def user_name_snapshots(batches):
+    def ops(docs):
+        repair_users(user_rows(docs))
+        return []
+    batches.run(User._get_collection(), {}, ops, projection={'name': 1})
+
+
+def run_migrations(only=None, rerun=()):
+    """Run pending migrations in order; `rerun` names are reset and run again."""
+    for name, fn in MIGRATIONS:
+        if only and name not in only:
+            continue
+        if name in rerun:
+            MigrationRecord.objects(name=name).delete()
+        record = MigrationRecord.objects(name=name).first()
+        if record and record.status == 'done':
+            print(f"  ✔️ {name} already applied")
+            continue
+        if record:
+            print(f"  ↩️ Resuming {name} after {record.processed} docs")
+        else:
+            record = MigrationRecord(name=name).save()
+            print(f"  ▶️ Running {name}")
+        started = time.perf_counter()
+        fn(Batches(record))
+        MigrationRecord.objects(name=name).update_one(set__status='done', set__finished_at=datetime.utcnow())
+        print(f"  ✅ {name} done in {time.perf_counter() - started:.1f}s")
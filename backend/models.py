@@ -1,5 +1,8 @@
-from mongoengine import Document, StringField, FloatField, DateTimeField, ReferenceField, CASCADE
-from datetime import datetime
+from mongoengine import Document, StringField, FloatField, IntField, BinaryField, DateTimeField, ListField, DictField, ReferenceField, ObjectIdField, CASCADE, signals
+from datetime import datetime, timedelta
+
+# Deleted products are remembered this long for delta-sync clients
+TOMBSTONE_RETENTION = timedelta(days=30)
 
 class User(Document):
     name = StringField(max_length=100, required=True)
@@ -7,8 +10,15 @@ class User(Document):
     password = StringField(max_length=200, required=True)
     role = StringField(max_length=20, required=True) # 'farmer', 'buyer', 'admin'
 
+    meta = {
+        'indexes': [
+            'role',  # Admin role counts and role-filtered user lists
+        ]
+    }
+
 class Product(Document):
     farmer = ReferenceField(User, reverse_delete_rule=CASCADE)
+    farmer_name = StringField() # Snapshot of farmer.name, kept current by snapshots.repair
     vegetable_name = StringField(required=True)
     market_price = FloatField(required=True) # Price buyer pays
     farmer_earnings = FloatField(required=True) # Price farmer gets (market_price - transport)
@@ -16,13 +26,148 @@ class Product(Document):
     image_url = StringField()
     status = StringField(default='pending') # 'pending', 'approved', 'refused'
     created_at = DateTimeField(default=datetime.utcnow)
+    # Bumped by every write (save() here; atomic updates must $set it too) for delta sync
+    updated_at = DateTimeField(default=datetime.utcnow)
+
+    meta = {
+        'indexes': [
+            # Catalog and pending queue: equality on status, keyset sort, then quantity range
+            ('status', '-created_at', '-id', 'quantity'),
+            ('farmer', '-created_at'),  # Farmer's own listings and per-farmer stats
+            '-created_at',  # Admin activity feed
+            ('farmer', 'updated_at'),  # Farmer delta sync
+            'updated_at',  # Pending-queue delta sync
+        ]
+    }
+
+    def save(self, *args, **kwargs):
+        self.updated_at = datetime.utcnow()
+        return super().save(*args, **kwargs)
 
 class Order(Document):
     buyer = ReferenceField(User, reverse_delete_rule=CASCADE)
     product = ReferenceField(Product, reverse_delete_rule=CASCADE)
+    farmer = ReferenceField(User) # The product's farmer, so name repairs need no join
+    # Snapshots written at checkout so listings and the ledger read one document
+    buyer_name = StringField()
+    product_name = StringField()
+    farmer_name = StringField()
     quantity = FloatField(required=True)
     total_price = FloatField(required=True)
     payment_method = StringField(required=True)
     delivery_address = StringField(required=True)
     status = StringField(default='completed')
     created_at = DateTimeField(default=datetime.utcnow)
+
+    meta = {
+        'indexes': [
+            ('buyer', '-created_at'),  # Buyer order history and per-buyer stats
+            'product',  # Cascade deletes and per-product lookups
+            '-created_at',  # Ledger, exports and activity feed
+            'farmer',  # Farmer name repairs
+        ]
+    }
+
+class Blob(Document):
+    # Content-addressed image storage: key is the sha256 of the original upload,
+    # thumbnails are stored alongside as '<sha256>_<size>'
+    key = StringField(primary_key=True)
+    content_type = StringField(required=True)
+    size = IntField()
+    data = BinaryField(required=True)
+    created_at = DateTimeField(default=datetime.utcnow)
+
+class Tombstone(Document):
+    # A deleted product, so delta-sync clients learn to drop it; expires after TOMBSTONE_RETENTION
+    doc_id = ObjectIdField(required=True)
+    farmer = ObjectIdField()
+    deleted_at = DateTimeField(default=datetime.utcnow)
+
+    meta = {
+        'indexes': [
+            {'fields': ['deleted_at'], 'expireAfterSeconds': int(TOMBSTONE_RETENTION.total_seconds())},
+            ('farmer', 'deleted_at'),
+        ]
+    }
+
+def _record_tombstone(sender, document, **kwargs):
+    # Fires for document.delete() and queryset/cascade deletes alike
+    Tombstone(doc_id=document.id, farmer=getattr(document._data.get('farmer'), 'id', None)).save()
+
+signals.post_delete.connect(_record_tombstone, sender=Product)
+
+class Counter(Document):
+    # Shared named counters, e.g. cache generations bumped on writes so every
+    # gunicorn worker sees the same version
+    name = StringField(primary_key=True)
+    value = IntField(default=0)
+
+class DailyStat(Document):
+    # Per-day order rollup maintained by place_order; day is 'YYYY-MM-DD' (UTC)
+    day = StringField(primary_key=True)
+    orders = IntField(default=0)
+    quantity = FloatField(default=0)
+    revenue = FloatField(default=0)
+
+class PriceBar(Document):
+    # Open/high/low/close of per-kg prices seen in listings and orders, per
+    # normalized vegetable name and UTC hour/day bucket; volume is kg sold.
+    # Id is '<resolution>:<key>:<bucket iso>' so concurrent upserts meet on _id
+    id = StringField(primary_key=True)
+    key = StringField(required=True)
+    name = StringField()
+    resolution = StringField(required=True) # 'hour', 'day'
+    bucket = DateTimeField(required=True)
+    open = FloatField()
+    high = FloatField()
+    low = FloatField()
+    close = FloatField()
+    open_at = DateTimeField()
+    close_at = DateTimeField()
+    volume = FloatField(default=0)
+    trades = IntField(default=0)
+    listed = FloatField(default=0)
+    listings = IntField(default=0)
+
+    meta = {
+        'indexes': [
+            ('key', 'resolution', 'bucket'),  # One vegetable's history
+            ('resolution', 'bucket'),  # Market summary over a window
+        ]
+    }
+
+class QualityJob(Document):
+    # Image quality analysis job, keyed by the sha256 of the image so repeat
+    # uploads reuse the first result
+    digest = StringField(primary_key=True)
+    vegetable_name = StringField()
+    status = StringField(default='queued') # 'queued', 'done', 'failed'
+    score = FloatField()
+    confidence = FloatField()
+    grade = StringField()
+    error = StringField()
+    created_at = DateTimeField(default=datetime.utcnow)
+    finished_at = DateTimeField()
+
+class MigrationRecord(Document):
+    # Applied / in-progress data migrations; checkpoint is the last _id processed
+    # so an interrupted run resumes instead of starting over
+    name = StringField(primary_key=True)
+    status = StringField(default='running') # 'running', 'done'
+    checkpoint = StringField()
+    processed = IntField(default=0)
+    started_at = DateTimeField(default=datetime.utcnow)
+    finished_at = DateTimeField()
+
+class Event(Document):
+    # Notification log in a capped collection: every worker tails it and fans
+    # events out to its own SSE subscribers (no replica set / change streams needed)
+    audience = ListField(StringField()) # user ids and/or 'role:<role>'
+    type = StringField(required=True)
+    data = DictField()
+    created_at = DateTimeField(default=datetime.utcnow)
+
+    meta = {
+        'max_documents': 10000,
+        'max_size': 16 * 1024 * 1024
+    }
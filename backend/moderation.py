@@ -0,0 +1,74 @@
+from models import Product
+from cache import invalidate, CATALOG
+from search import catalog_index
+from events import publish, ADMINS
+from pagination import ref_id
+from pymongo import UpdateMany
+from bson import ObjectId
+from collections import defaultdict
+from datetime import datetime
+
+ACTIONS = ('approved', 'refused')
+# Per request; a filter matching more reports how many are left for the next call
+MAX_BATCH = 1000
+_FIELDS = ('vegetable_name', 'market_price', 'quantity', 'image_url', 'farmer', 'farmer_name', 'status')
+
+
+def matching_ids(farmer_id=None, status='pending', vegetable_name=None, limit=MAX_BATCH):
+    """Ids for filter mode ("everything pending from farmer X"); returns (ids, total matching)."""
+    query = {'status': status}
+    if farmer_id:
+        query['farmer'] = ObjectId(farmer_id)
+    if vegetable_name:
+        query['vegetable_name'] = vegetable_name
+    products = Product.objects(**query)
+    return [str(i) for i in products.order_by('created_at').limit(limit).scalar('id')], products.count()
+
+
+def moderate(decisions):
+    """
+    Apply {product_id: action} with one bulk_write: an UpdateMany $set per
+    action over exactly the ids that change, then one catalog invalidation,
+    one index sync and one event per farmer. Returns {product_id: result}
+    where result is 'updated', 'unchanged', 'not_found' or 'invalid_action'.
+    """
+    results = {}
+    wanted = {}
+    for product_id, action in decisions.items():
+        if action not in ACTIONS:
+            results[product_id] = 'invalid_action'
+        elif not ObjectId.is_valid(product_id):
+            results[product_id] = 'not_found'
+        else:
+            wanted[ObjectId(product_id)] = action
+
+    found = {p.id: p for p in Product.objects(id__in=list(wanted)).only(*_FIELDS).no_dereference()}
+    by_action = defaultdict(list)
+    changed = []
+    for oid, action in wanted.items():
+        product = found.get(oid)
+        if product is None:
+            results[str(oid)] = 'not_found'
+        elif product.status == action:
+            results[str(oid)] = 'unchanged'
+        else:
+            by_action[action].append(oid)
+            product.status = action
+            changed.append(product)
+            results[str(oid)] = 'updated'
+    if not changed:
+        return results
+
+    now = datetime.utcnow()
+    Product._get_collection().bulk_write([
+        UpdateMany({'_id': {'$in': ids}, 'status': {'$ne': action}}, {'$set': {'status': action, 'updated_at': now}})
+        for action, ids in by_action.items()], ordered=False)
+
+    catalog_index.sync(invalidate(CATALOG), changed)
+    by_farmer = defaultdict(list)
+    for p in changed:
+        by_farmer[ref_id(p.farmer)].append({"product_id": str(p.id), "name": p.vegetable_name, "status": p.status})
+    for farmer_id, items in by_farmer.items():
+        publish('moderation', [farmer_id], {"products": items})
+    publish('moderation', [ADMINS], {"products": [i for items in by_farmer.values() for i in items]})
+    return results
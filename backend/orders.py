@@ -0,0 +1,89 @@
+from models import Product, Order, DailyStat
+from cache import invalidate, CATALOG
+from search import catalog_index
+from prices import record_sales
+from events import publish, ADMINS
+from pagination import stored_ref_id
+from snapshots import user_name
+from bson import ObjectId
+from collections import defaultdict
+from datetime import datetime
+
+
+def reserve_stock(product_id, quantity):
+    """
+    Atomically take `quantity` kg from a product's stock in one round trip.
+    The filter only matches while enough stock remains, so concurrent buyers
+    can never oversell. Returns the product as it was before the decrement,
+    or None when it is missing or short of stock.
+    """
+    if not ObjectId.is_valid(str(product_id)):
+        return None
+    return Product.objects(id=product_id, quantity__gte=quantity).modify(
+        dec__quantity=quantity, set__updated_at=datetime.utcnow())
+
+
+def release_stock(product_id, quantity):
+    Product.objects(id=product_id).update_one(inc__quantity=quantity, set__updated_at=datetime.utcnow())
+
+
+def record_orders(orders):
+    """Insert orders in one batch, fold them into the daily and price rollups and refresh the catalog."""
+    Order.objects.insert(orders, load_bulk=False)
+    days = defaultdict(lambda: [0, 0.0, 0.0])
+    for o in orders:
+        day = days[o.created_at.strftime("%Y-%m-%d")]
+        day[0] += 1
+        day[1] += o.quantity
+        day[2] += o.total_price
+    for day, (count, quantity, revenue) in days.items():
+        DailyStat.objects(day=day).update_one(
+            inc__orders=count, inc__quantity=quantity, inc__revenue=revenue, upsert=True)
+    record_sales(orders)
+    catalog_index.sync(invalidate(CATALOG), [o.product for o in orders])
+    for o in orders:
+        publish('order', [stored_ref_id(o.product, 'farmer'), ADMINS], {
+            "order_id": str(o.id), "product_id": str(o.product.id), "name": o.product.vegetable_name,
+            "quantity": o.quantity, "remaining": o.product.quantity, "amount": o.total_price})
+
+
+def checkout(buyer_id, items, payment_method, delivery_address):
+    """
+    Place a multi-product cart all-or-nothing. Each line is reserved with its
+    own conditional update (bulk results do not say which filters matched);
+    if any line is short, the lines already reserved are released. The orders
+    are then written with a single insert.
+
+    Returns (orders, None) on success or (None, failed_product_id).
+    """
+    # Merge repeated lines for the same product into one reservation
+    wanted = defaultdict(float)
+    for item in items:
+        wanted[str(item['product_id'])] += float(item['quantity'])
+
+    reserved = []
+    for product_id, quantity in wanted.items():
+        product = reserve_stock(product_id, quantity)
+        if not product:
+            for done, qty in reserved:
+                release_stock(done.id, qty)
+            return None, product_id
+        # The reservation returns the pre-decrement document; bring it up to date
+        product.quantity -= quantity
+        reserved.append((product, quantity))
+
+    buyer_name = user_name(buyer_id)
+    orders = [Order(
+        buyer=ObjectId(buyer_id),
+        product=product,
+        farmer=stored_ref_id(product, 'farmer'),
+        buyer_name=buyer_name,
+        product_name=product.vegetable_name,
+        farmer_name=product.farmer_name,
+        quantity=quantity,
+        total_price=quantity * product.market_price,
+        payment_method=payment_method,
+        delivery_address=delivery_address
+    ) for product, quantity in reserved]
+    record_orders(orders)
+    return orders, None
@@ -0,0 +1,66 @@
+from mongoengine.queryset.visitor import Q
+from bson import ObjectId
+from datetime import datetime
+import base64
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def page_size(args, default=DEFAULT_PAGE_SIZE):
+    """Read ?limit= from the query string, clamped to [1, MAX_PAGE_SIZE]."""
+    try:
+        limit = int(args.get('limit', default))
+    except (TypeError, ValueError):
+        limit = default
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def encode_cursor(created_at, doc_id):
+    raw = f"{created_at.isoformat()}|{doc_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return (created_at, ObjectId) or raise ValueError for a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, doc_id = raw.split('|')
+        return datetime.fromisoformat(created_at), ObjectId(doc_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def keyset_page(queryset, cursor, limit):
+    """
+    One page of a queryset in (-created_at, -_id) order, seeking past the cursor
+    instead of skipping, so every page costs the same regardless of depth.
+    Returns (documents, next_cursor); next_cursor is None on the last page.
+    """
+    if cursor:
+        created_at, doc_id = decode_cursor(cursor)
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=doc_id))
+    docs = list(queryset.order_by('-created_at', '-id').limit(limit + 1))
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1].created_at, docs[-1].id)
+    return docs, next_cursor
+
+
+def ref_id(ref):
+    """Id of a ReferenceField value whether it is a DBRef or a loaded Document."""
+    return getattr(ref, 'id', None)
+
+
+def stored_ref_id(doc, field):
+    """Id stored in a document's reference field, without dereferencing it."""
+    return ref_id(doc._data.get(field)) or doc._data.get(field)
+
+
+def names_by_id(model, ids, field='name'):
+    """Resolve display names for a page of references with one batched query."""
+    ids = {i for i in ids if i is not None}
+    if not ids:
+        return {}
+    return {doc_id: name for doc_id, name in model.objects(id__in=list(ids)).scalar('id', field)}
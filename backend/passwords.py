@@ -0,0 +1,80 @@
+from werkzeug.security import generate_password_hash, check_password_hash
+from pools import ProcessPool
+from concurrent.futures import TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import os
+import threading
+
+# Current KDF parameters; hashes stored with anything else are upgraded on the next successful login
+HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+HASH_WORKERS = int(os.getenv('HASH_WORKERS', 2))
+# Hashes queued or running per web worker before new ones are turned away
+MAX_PENDING = int(os.getenv('HASH_MAX_PENDING', 16))
+HASH_TIMEOUT_S = float(os.getenv('HASH_TIMEOUT_S', 10))
+
+# This module imports no models, so the pool's children never load mongoengine
+_pool = ProcessPool(HASH_WORKERS)
+_slots = {'pid': None, 'semaphore': None}
+_lock = threading.Lock()
+
+
+class HashUnavailable(Exception):
+    """
+    Raised when a hash cannot be computed right now: MAX_PENDING are already
+    in flight in this worker, it took longer than HASH_TIMEOUT_S, or the pool
+    lost a child (it is rebuilt for the next call).
+    """
+
+
+def _semaphore():
+    with _lock:
+        if _slots['pid'] != os.getpid():
+            _slots['semaphore'] = threading.BoundedSemaphore(MAX_PENDING)
+            _slots['pid'] = os.getpid()
+        return _slots['semaphore']
+
+
+def _submit(fn, *args):
+    slots = _semaphore()
+    if not slots.acquire(blocking=False):
+        raise HashUnavailable("queue full")
+    try:
+        future = _pool.submit(fn, *args)
+    except BrokenProcessPool as e:
+        slots.release()
+        raise HashUnavailable("pool unavailable") from e
+    except Exception:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    # The waiting request thread holds no GIL while the KDF runs in the child
+    try:
+        return future.result(timeout=HASH_TIMEOUT_S)
+    except (TimeoutError, BrokenProcessPool) as e:
+        raise HashUnavailable("hashing timed out or the pool failed") from e
+
+
+def needs_rehash(stored):
+    return stored.split('$', 1)[0] != HASH_METHOD
+
+
+def _verify(stored, password):
+    # Runs in the pool: check, and produce the upgraded hash in the same round trip
+    if not check_password_hash(stored, password):
+        return False, None
+    return True, generate_password_hash(password, HASH_METHOD) if needs_rehash(stored) else None
+
+
+def hash_password(password):
+    return _submit(generate_password_hash, password, HASH_METHOD)
+
+
+def verify_password(stored, password):
+    """
+    Check a password against its stored hash off the request thread.
+    Returns (ok, new_hash); new_hash is set when the stored parameters are
+    out of date and should replace the stored hash.
+    """
+    if not stored:
+        return False, None
+    return _submit(_verify, stored, password)
@@ -0,0 +1,54 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import os
+import threading
+
+
+class ProcessPool:
+    """
+    A ProcessPoolExecutor per gunicorn worker, created lazily after fork.
+    'spawn' keeps the children free of the parent's Mongo client threads and
+    locks. If a child dies (OOM, SIGKILL) the executor is broken for good, so
+    it is dropped and the next submit starts a fresh one.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._pid = None
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _current(self):
+        with self._lock:
+            if self._pid != os.getpid() or self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+                self._pid = os.getpid()
+            return self._executor
+
+    def _discard(self, executor):
+        with self._lock:
+            if self._executor is not executor:
+                return  # Another thread already replaced it
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, fn, *args):
+        """Submit to the live executor, replacing it once if it turns out to be broken."""
+        for attempt in (1, 2):
+            executor = self._current()
+            try:
+                future = executor.submit(fn, *args)
+            except BrokenProcessPool:
+                self._discard(executor)
+                if attempt == 2:
+                    raise
+                continue
+            future.add_done_callback(lambda f: self._check(executor, f))
+            return future
+
+    def _check(self, executor, future):
+        # A child dying mid-task breaks the pool without failing the next submit first
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            self._discard(executor)
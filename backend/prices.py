@@ -0,0 +1,143 @@
+from models import PriceBar
+from search import normalize
+from datetime import datetime, timedelta
+
+RESOLUTIONS = ('hour', 'day')
+# Default window when ?from= is not given
+DEFAULT_SPAN = {'hour': timedelta(days=2), 'day': timedelta(days=30)}
+_EPOCH = datetime(1970, 1, 1)
+_NEVER = datetime(9999, 1, 1)
+
+
+def bucket_start(at, resolution):
+    at = at.replace(minute=0, second=0, microsecond=0)
+    return at.replace(hour=0) if resolution == 'day' else at
+
+
+def bar_id(key, resolution, bucket):
+    return f"{resolution}:{key}:{bucket.isoformat()}"
+
+
+def accumulate(points):
+    """
+    Fold (name, price per kg, at, kg sold, kg listed) observations into one
+    partial bar per vegetable and bucket, for every resolution.
+    """
+    bars = {}
+    for name, price, at, sold, listed in points:
+        key = normalize(name)
+        if not key or price is None:
+            continue
+        # Prices derived from total / quantity carry float noise
+        price = round(price, 2)
+        for resolution in RESOLUTIONS:
+            bucket = bucket_start(at, resolution)
+            bar = bars.get(bar_id(key, resolution, bucket))
+            if bar is None:
+                bar = bars[bar_id(key, resolution, bucket)] = {
+                    'key': key, 'name': name, 'resolution': resolution, 'bucket': bucket,
+                    'open': price, 'open_at': at, 'close': price, 'close_at': at, 'high': price, 'low': price,
+                    'volume': 0.0, 'trades': 0, 'listed': 0.0, 'listings': 0}
+            if at < bar['open_at']:
+                bar['open'], bar['open_at'] = price, at
+            if at >= bar['close_at']:
+                bar['close'], bar['close_at'] = price, at
+            bar['high'] = max(bar['high'], price)
+            bar['low'] = min(bar['low'], price)
+            if sold:
+                bar['volume'] += sold
+                bar['trades'] += 1
+            if listed:
+                bar['listed'] += listed
+                bar['listings'] += 1
+    return bars
+
+
+def _merge(bar):
+    """
+    Update pipeline folding a partial bar into the stored one. Every field is
+    merged order-independently (open/close by timestamp), so concurrent
+    workers and late writes give the same bar as a sequential replay.
+    """
+    def add(field):
+        return {'$add': [{'$ifNull': [f'${field}', 0]}, bar[field]]}
+    return [{'$set': {
+        'key': {'$literal': bar['key']}, 'name': {'$literal': bar['name']}, 'resolution': bar['resolution'], 'bucket': bar['bucket'],
+        'open': {'$cond': [{'$lt': [bar['open_at'], {'$ifNull': ['$open_at', _NEVER]}]}, bar['open'], '$open']},
+        'open_at': {'$min': ['$open_at', bar['open_at']]},
+        'close': {'$cond': [{'$gte': [bar['close_at'], {'$ifNull': ['$close_at', _EPOCH]}]}, bar['close'], '$close']},
+        'close_at': {'$max': ['$close_at', bar['close_at']]},
+        'high': {'$max': ['$high', bar['high']]},
+        'low': {'$min': ['$low', bar['low']]},
+        'volume': add('volume'), 'trades': add('trades'), 'listed': add('listed'), 'listings': add('listings'),
+    }}]
+
+
+def observe(points):
+    """Fold observations into the stored bars: one upsert per touched bar."""
+    collection = PriceBar._get_collection()
+    for _id, bar in accumulate(points).items():
+        collection.update_one({'_id': _id}, _merge(bar), upsert=True)
+
+
+def rebuild_day(orders, products):
+    """
+    Recompute every bar inside one UTC day from that day's orders (dicts with
+    name, quantity, total_price, created_at) and listings, replacing what is
+    stored. Idempotent, unlike observe(). Returns the number of bars written.
+    """
+    points = [(o['name'], o['total_price'] / o['quantity'], o['created_at'], o['quantity'], 0)
+              for o in orders if o['quantity']]
+    points += [(p.vegetable_name, p.market_price, p.created_at, 0, p.quantity)
+               for p in products if p.status != 'refused']
+    collection = PriceBar._get_collection()
+    bars = accumulate(points)
+    for _id, bar in bars.items():
+        collection.replace_one({'_id': _id}, bar, upsert=True)
+    return len(bars)
+
+
+def record_sales(orders):
+    observe((o.product.vegetable_name, o.total_price / o.quantity, o.created_at, o.quantity, 0)
+            for o in orders if o.quantity)
+
+
+def record_listings(products):
+    # Refused listings never reached the market; their price is not a quote
+    observe((p.vegetable_name, p.market_price, p.created_at, 0, p.quantity)
+            for p in products if p.status != 'refused')
+
+
+def _window(resolution, start, end):
+    end = end or datetime.utcnow()
+    return start or bucket_start(end - DEFAULT_SPAN[resolution], resolution), end
+
+
+def history(name, resolution, start=None, end=None):
+    """Bars for one vegetable, oldest first."""
+    start, end = _window(resolution, start, end)
+    return list(PriceBar.objects(key=normalize(name), resolution=resolution, bucket__gte=start, bucket__lt=end)
+                .order_by('bucket').exclude('open_at', 'close_at'))
+
+
+def summary(resolution, start=None, end=None):
+    """Per vegetable over the window: first open, last close, range and volume (from the rollup only)."""
+    start, end = _window(resolution, start, end)
+    return list(PriceBar.objects(resolution=resolution, bucket__gte=start, bucket__lt=end).aggregate([
+        {"$sort": {"bucket": 1}},
+        {"$group": {
+            "_id": "$key",
+            "name": {"$last": "$name"},
+            "open": {"$first": "$open"},
+            "close": {"$last": "$close"},
+            "high": {"$max": "$high"},
+            "low": {"$min": "$low"},
+            "volume": {"$sum": "$volume"},
+            "trades": {"$sum": "$trades"}
+        }},
+        {"$sort": {"volume": -1}}
+    ]))
+
+
+def change(first, last):
+    return round((last - first) / first * 100, 2) if first else None
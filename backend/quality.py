@@ -0,0 +1,45 @@
+from PIL import Image
+import numpy as np
+import io
+
+# Work on a fixed downsample so cost is bounded and scores do not depend on resolution
+ANALYSIS_SIZE = 128
+HUE_BINS = 16
+
+
+def grade_for(score):
+    if score < 40: return "Rejected"
+    if score > 90: return "Premium Export Quality"
+    if score > 80: return "Grade A"
+    if score > 60: return "Grade B"
+    return "Grade C"
+
+
+def score_image(data):
+    """
+    Deterministic, CPU-only quality score from the image's pixels.
+
+    Fresh produce photographs as saturated, well-lit colour; rot and bruising
+    show up as dark or brown patches. The score rewards the vivid share of the
+    image and penalises dark and brown shares. Confidence is how concentrated
+    the vivid pixels are in one hue (a single dominant colour reads as one
+    kind of vegetable). Runs in a worker process, so it must stay picklable
+    and free of Flask/Mongo state.
+    """
+    img = Image.open(io.BytesIO(data)).convert('RGB')
+    img.thumbnail((ANALYSIS_SIZE, ANALYSIS_SIZE))
+    hsv = np.asarray(img.convert('HSV'), dtype=np.float32) / 255.0
+    h, s, v = hsv[..., 0], hsv[..., 1], hsv[..., 2]
+
+    vivid = (s > 0.35) & (v > 0.35)
+    dark = v < 0.2
+    brown = (h > 0.02) & (h < 0.12) & (s > 0.3) & (v >= 0.2) & (v < 0.45)
+
+    vivid_share = float(vivid.mean())
+    raw = 0.35 + 0.65 * vivid_share - 0.9 * float(brown.mean()) - 0.5 * float(dark.mean())
+    score = round(100 * min(max(raw, 0.0), 1.0), 1)
+
+    hist, _ = np.histogram(h[vivid], bins=HUE_BINS, range=(0.0, 1.0))
+    confidence = float(hist.max() / hist.sum()) if hist.sum() else 0.0
+
+    return {"score": score, "confidence": round(confidence, 3), "grade": grade_for(score)}
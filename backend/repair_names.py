@@ -0,0 +1,33 @@
+"""
+Re-copy display names onto listings and orders after users were renamed
+outside rename_user() (e.g. edited directly in the database).
+
+    cd backend && python repair_names.py                 # everything
+    cd backend && python repair_names.py a@x.com b@y.com  # just these users
+"""
+from models import User
+from snapshots import repair_all, repair_users
+from mongoengine import connect
+import argparse
+import os
+import time
+from dotenv import load_dotenv
+import certifi
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument('emails', nargs='*', help="only these users (default: every product and user)")
+args = parser.parse_args()
+
+load_dotenv()
+ca = certifi.where()
+connect(host=os.getenv('MONGO_URI'), tlsCAFile=ca)
+
+started = time.perf_counter()
+if args.emails:
+    users = list(User.objects(email__in=args.emails).scalar('id', 'name'))
+    print(f"🔧 Repairing names for {len(users)} of {len(args.emails)} users...")
+    modified = repair_users(users)
+else:
+    print("🔧 Repairing name snapshots across all products and users...")
+    modified = repair_all()
+print(f"✅ {modified} documents updated in {time.perf_counter() - started:.1f}s")
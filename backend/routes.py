@@ -1,7 +1,23 @@
-from flask import Blueprint, request, jsonify, send_from_directory, current_app
-from models import User, Product, Order
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from models import User, Product, Order, DailyStat, QualityJob
+from blobstore import store_image, thumbnail_url
+from pagination import page_size, keyset_page
+from cache import versioned_cache, invalidate, CATALOG
+from delta import product_changes
+from snapshots import user_name
+from ledger import parse_date_range, transaction_rows, stream_csv, stream_ndjson
+from orders import checkout
+from jobs import submit_quality_job, job_result
+from search import catalog_index, MAX_RESULTS
+from events import publish, ADMINS
+from moderation import moderate, matching_ids, ACTIONS, MAX_BATCH
+from prices import record_listings, history, summary, change, RESOLUTIONS
+from listings import calculate_price, status_for, parse_rows, import_listings, MIN_QUANTITY_KG, MAX_BULK_ROWS
+from flask_jwt_extended import create_access_token
+from auth import requires_role, current_identity
+from passwords import hash_password, verify_password, HashUnavailable
+from throttle import login_wait, login_addresses
+import math
 import os
 import json
 from werkzeug.utils import secure_filename
@@ -9,22 +25,23 @@ from bson import ObjectId
 
 api = Blueprint('api', __name__)
 
-# Pricing Logic
-# Pricing Logic
-def calculate_price(farmer_price_per_kg, quantity):
-    platform_fee_percent = 0.15
-    platform_fee_per_kg = farmer_price_per_kg * platform_fee_percent
-    farmer_earnings_per_kg = farmer_price_per_kg - platform_fee_per_kg
-    return farmer_earnings_per_kg, platform_fee_per_kg * quantity
+def _busy(wait_s, status=429):
+    response = jsonify({"msg": "Too many attempts, try again shortly" if status == 429 else "Server busy, try again shortly"})
+    response.headers['Retry-After'] = str(max(1, math.ceil(wait_s)))
+    return response, status
 
 @api.route('/api/auth/register', methods=['POST'])
 def register():
     try:
         data = request.get_json()
+        # remote_addr is the client's address when PROXY_HOPS matches the proxies in front (app.py)
+        wait = login_addresses.take(request.remote_addr or '')
+        if wait:
+            return _busy(wait)
         if User.objects(email=data['email']).first():
             return jsonify({"msg": "Email already exists"}), 400
         
-        hashed_password = generate_password_hash(data['password'])
+        hashed_password = hash_password(data['password'])
         new_user = User(
             name=data['name'],
             email=data['email'],
@@ -33,14 +50,27 @@ def register():
         )
         new_user.save()
         return jsonify({"msg": "User created successfully"}), 201
+    except HashUnavailable:
+        return _busy(1, 503)
     except Exception as e:
         return jsonify({"msg": f"Registration failed: {str(e)}"}), 500
 
 @api.route('/api/auth/login', methods=['POST'])
 def login():
     data = request.get_json()
-    user = User.objects(email=data['email']).first()
-    if user and check_password_hash(user.password, data['password']):
+    # Throttled per address and per account before any hashing is spent
+    wait = login_wait(data.get('email'), request.remote_addr)
+    if wait:
+        return _busy(wait)
+    user = User.objects(email=data['email']).only('id', 'name', 'role', 'password').first()
+    try:
+        ok, new_hash = verify_password(user.password if user else None, data['password'])
+    except HashUnavailable:
+        return _busy(1, 503)
+    if ok:
+        if new_hash:
+            # Upgrade outdated KDF parameters; skipped if the password changed meanwhile
+            User.objects(id=user.id, password=user.password).update_one(set__password=new_hash)
         identity_dict = {'id': str(user.id), 'role': user.role, 'name': user.name}
         access_token = create_access_token(identity=json.dumps(identity_dict))
         return jsonify(access_token=access_token, role=user.role, name=user.name), 200
@@ -48,121 +78,167 @@ def login():
 
 # --- Admin Routes ---
 @api.route('/api/admin/stats', methods=['GET'])
-@jwt_required()
+@requires_role('admin')
 def get_admin_stats():
-    raw_identity = get_jwt_identity()
-    try:
-        identity = json.loads(raw_identity) if isinstance(raw_identity, str) else raw_identity
-    except:
-         return jsonify({"msg": "Invalid token"}), 422
-         
-    if identity['role'] != 'admin':
-        return jsonify({"msg": "Unauthorized"}), 403
-    
-    total_farmers = User.objects(role='farmer').count()
-    total_buyers = User.objects(role='buyer').count()
+    role_counts = {row['_id']: row['count'] for row in User.objects.aggregate([
+        {"$group": {"_id": "$role", "count": {"$sum": 1}}}
+    ])}
     total_products = Product.objects.count()
-    orders = Order.objects()
-    
-    total_savings = sum(o.quantity * 5 for o in orders)
-    total_revenue = sum(o.total_price for o in orders)
-    
+    # Totals come from the per-day rollup (O(days)), not from scanning orders
+    totals = next(DailyStat.objects.aggregate([
+        {"$group": {"_id": None, "orders": {"$sum": "$orders"},
+                    "quantity": {"$sum": "$quantity"}, "revenue": {"$sum": "$revenue"}}}
+    ]), {"orders": 0, "quantity": 0, "revenue": 0})
+
     activity_feed = []
     # Recent Orders
-    for o in Order.objects.order_by('-created_at').limit(10):
+    recent_orders = Order.objects.only('buyer_name', 'product_name', 'quantity', 'created_at') \
+        .order_by('-created_at').limit(10)
+    for o in recent_orders:
         activity_feed.append({
             "type": "order",
-            "detail": f"Buyer {o.buyer.name if o.buyer else 'Unknown'} bought {o.quantity}kg of {o.product.vegetable_name if o.product else 'Unknown'}",
+            "detail": f"Buyer {o.buyer_name or 'Unknown'} bought {o.quantity}kg of {o.product_name or 'Unknown'}",
             "date": o.created_at.strftime("%Y-%m-%d %H:%M"),
             "amount": f"+₹{o.quantity * 5} Logistics"
         })
     # Recent Listings
-    for p in Product.objects.order_by('-created_at').limit(10):
+    recent_products = Product.objects.only('farmer_name', 'vegetable_name', 'created_at') \
+        .order_by('-created_at').limit(10)
+    for p in recent_products:
         activity_feed.append({
             "type": "listing",
-            "detail": f"Farmer {p.farmer.name if p.farmer else 'Unknown'} listed {p.vegetable_name}",
+            "detail": f"Farmer {p.farmer_name or 'Unknown'} listed {p.vegetable_name}",
             "date": p.created_at.strftime("%Y-%m-%d %H:%M"),
             "amount": "New Listing"
         })
     
     return jsonify({
-        "total_farmers": total_farmers,
-        "total_buyers": total_buyers,
+        "total_farmers": role_counts.get('farmer', 0),
+        "total_buyers": role_counts.get('buyer', 0),
         "total_products": total_products,
-        "total_orders": len(orders),
-        "total_bindings": total_savings, # saving -> bindings/revenue
-        "total_revenue": total_revenue,
+        "total_orders": totals['orders'],
+        "total_bindings": totals['quantity'] * 5, # saving -> bindings/revenue
+        "total_revenue": totals['revenue'],
         "recent_activity": sorted(activity_feed, key=lambda x: x['date'], reverse=True)
     })
 
 @api.route('/api/admin/pending-products', methods=['GET'])
-@jwt_required()
+@requires_role('admin')
 def get_pending_products():
-    raw_identity = get_jwt_identity()
-    try:
-        identity = json.loads(raw_identity) if isinstance(raw_identity, str) else raw_identity
-    except: return jsonify({"msg": "Invalid token"}), 422
+    # ?since=<cursor> (empty for a first full sync) returns only what changed
+    if 'since' in request.args:
+        try:
+            products, removed, cursor, full = product_changes(request.args['since'], {}, {'status': 'pending'})
+        except ValueError as e:
+            return jsonify({"msg": str(e)}), 400
+    else:
+        products = Product.objects(status='pending').order_by('-created_at')
 
-    if identity['role'] != 'admin':
-        return jsonify({"msg": "Unauthorized"}), 403
-    
-    products = Product.objects(status='pending').order_by('-created_at')
     result = []
     for p in products:
         result.append({
             "id": str(p.id),
             "name": p.vegetable_name,
-            "farmer_name": p.farmer.name if p.farmer else "Unknown",
+            "farmer_name": p.farmer_name or "Unknown",
             "quantity": p.quantity,
             "final_price": p.market_price,
-            "image": p.image_url
+            "image": thumbnail_url(p.image_url),
+            "image_full": p.image_url
         })
+    if 'since' in request.args:
+        return jsonify({"items": result, "removed": removed, "cursor": cursor, "full": full})
     return jsonify(result)
 
 @api.route('/api/admin/product-action', methods=['POST'])
-@jwt_required()
+@requires_role('admin')
 def product_action():
-    raw_identity = get_jwt_identity()
-    try:
-        identity = json.loads(raw_identity) if isinstance(raw_identity, str) else raw_identity
-    except: return jsonify({"msg": "Invalid token"}), 422
-
-    if identity['role'] != 'admin': return jsonify({"msg": "Unauthorized"}), 403
-    
     data = request.get_json()
-    p = Product.objects(id=data['product_id']).first()
-    if p:
-        p.status = data['action']
-        p.save()
-        return jsonify({"msg": "Success"}), 200
-    return jsonify({"msg": "Not found"}), 404
+    result = moderate({str(data.get('product_id')): data.get('action')})
+    status = next(iter(result.values()))
+    if status == 'not_found':
+        return jsonify({"msg": "Not found"}), 404
+    if status == 'invalid_action':
+        return jsonify({"msg": "Action must be approved or refused"}), 400
+    return jsonify({"msg": "Success"}), 200
+
+@api.route('/api/admin/product-actions', methods=['POST'])
+@requires_role('admin')
+def bulk_product_action():
+    # Either {"actions": [{"product_id", "action"}, ...]} or
+    # {"filter": {"farmer_id", "vegetable_name", "status"}, "action"} ("approve all pending from farmer X")
+    data = request.get_json() or {}
+    remaining = 0
+    if 'filter' in data:
+        if data.get('action') not in ACTIONS:
+            return jsonify({"msg": "Action must be approved or refused"}), 400
+        criteria = data['filter'] or {}
+        if criteria.get('farmer_id') and not ObjectId.is_valid(criteria['farmer_id']):
+            return jsonify({"msg": "Invalid farmer_id"}), 400
+        ids, total = matching_ids(criteria.get('farmer_id'), criteria.get('status', 'pending'),
+                                  criteria.get('vegetable_name'))
+        decisions = {product_id: data.get('action') for product_id in ids}
+        remaining = total - len(ids)
+    else:
+        actions = data.get('actions') or []
+        if len(actions) > MAX_BATCH:
+            return jsonify({"msg": f"At most {MAX_BATCH} actions per request"}), 400
+        try:
+            # A repeated id takes its last action
+            decisions = {str(a['product_id']): a['action'] for a in actions}
+        except (KeyError, TypeError):
+            return jsonify({"msg": "Each action needs a product_id and action"}), 400
+
+    results = moderate(decisions)
+    return jsonify({
+        "results": [{"product_id": product_id, "result": result} for product_id, result in results.items()],
+        "updated": sum(1 for r in results.values() if r == 'updated'),
+        "remaining": remaining
+    }), 200
 
 @api.route('/api/admin/users', methods=['GET'])
-@jwt_required()
+@requires_role('admin')
 def get_all_users():
-    raw_identity = get_jwt_identity()
-    try:
-        identity = json.loads(raw_identity) if isinstance(raw_identity, str) else raw_identity
-    except: return jsonify({"msg": "Invalid token"}), 422
-    
-    if identity['role'] != 'admin': return jsonify({"msg": "Unauthorized"}), 403
-    
-    users = User.objects()
+    # Paginated newest-first by _id: ?role=farmer|buyer&limit=<n>&cursor=<next_cursor>
+    limit = page_size(request.args)
+    role = request.args.get('role')
+    if role and role not in ('farmer', 'buyer'):
+        return jsonify({"msg": "Invalid role filter"}), 400
+    users = User.objects(role=role) if role else User.objects(role__ne='admin')
+    if request.args.get('cursor'):
+        if not ObjectId.is_valid(request.args['cursor']):
+            return jsonify({"msg": "Invalid cursor"}), 400
+        users = users.filter(id__lt=ObjectId(request.args['cursor']))
+    users = list(users.only('id', 'name', 'email', 'role').order_by('-id').limit(limit + 1))
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = str(users[-1].id)
+
+    # Per-user stats for the whole page in two grouped aggregations
+    farmer_ids = [u.id for u in users if u.role == 'farmer']
+    buyer_ids = [u.id for u in users if u.role == 'buyer']
+    farmer_stats = {row['_id']: row for row in Product.objects(farmer__in=farmer_ids).aggregate([
+        {"$group": {
+            "_id": "$farmer",
+            "listings": {"$sum": 1},
+            "listings_active": {"$sum": {"$cond": [{"$eq": ["$status", "approved"]}, 1, 0]}}
+        }}
+    ])} if farmer_ids else {}
+    buyer_stats = {row['_id']: row for row in Order.objects(buyer__in=buyer_ids).aggregate([
+        {"$group": {"_id": "$buyer", "orders_placed": {"$sum": 1}, "total_spent": {"$sum": "$total_price"}}}
+    ])} if buyer_ids else {}
+
     result = []
     for u in users:
-        if u.role == 'admin': continue
-        
         stats = {}
         if u.role == 'farmer':
-            products = Product.objects(farmer=u)
-            stats['listings'] = products.count()
-            # Calculate total sales value for this farmer from orders of their products
-            # This is complex in NoSQL without aggregation framework, keeping it simple:
-            stats['listings_active'] = products.filter(status='approved').count()
+            row = farmer_stats.get(u.id, {})
+            stats['listings'] = row.get('listings', 0)
+            stats['listings_active'] = row.get('listings_active', 0)
         elif u.role == 'buyer':
-            orders = Order.objects(buyer=u)
-            stats['orders_placed'] = orders.count()
-            stats['total_spent'] = sum([o.total_price for o in orders])
+            row = buyer_stats.get(u.id, {})
+            stats['orders_placed'] = row.get('orders_placed', 0)
+            stats['total_spent'] = row.get('total_spent', 0)
             
         result.append({
             "id": str(u.id),
@@ -172,178 +248,244 @@ def get_all_users():
             "joined": str(u.id.generation_time.date()),
             "stats": stats
         })
-    return jsonify(result)
+    return jsonify({"items": result, "next_cursor": next_cursor})
 
 @api.route('/api/admin/transactions', methods=['GET'])
-@jwt_required()
+@requires_role('admin')
 def get_all_transactions():
-    raw_identity = get_jwt_identity()
     try:
-        identity = json.loads(raw_identity) if isinstance(raw_identity, str) else raw_identity
-    except: return jsonify({"msg": "Invalid token"}), 422
-    
-    if identity['role'] != 'admin': return jsonify({"msg": "Unauthorized"}), 403
-    
-    orders = Order.objects().order_by('-created_at')
-    result = []
-    for o in orders:
-        if not o.product: continue # Skip if product deleted
-        result.append({
-            "id": str(o.id),
-            "buyer": o.buyer.name if o.buyer else "Unknown",
-            "product": o.product.vegetable_name,
-            "farmer": o.product.farmer.name if (o.product and o.product.farmer) else "Unknown",
-            "quantity": o.quantity,
-            "amount": o.total_price,
-            "payment_method": o.payment_method,
-            "status": o.status,
-            "date": o.created_at.strftime("%Y-%m-%d %H:%M")
-        })
-    return jsonify(result)
+        start, end = parse_date_range(request.args)
+    except ValueError:
+        return jsonify({"msg": "Dates must be YYYY-MM-DD"}), 400
+    return jsonify(list(transaction_rows(start, end)))
+
+@api.route('/api/admin/transactions/export', methods=['GET'])
+@requires_role('admin')
+def export_transactions():
+    # Streams rows as they come off the cursor: ?format=csv|ndjson&from=YYYY-MM-DD&to=YYYY-MM-DD
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({"msg": "Format must be csv or ndjson"}), 400
+    try:
+        start, end = parse_date_range(request.args)
+    except ValueError:
+        return jsonify({"msg": "Dates must be YYYY-MM-DD"}), 400
+
+    rows = transaction_rows(start, end)
+    if fmt == 'csv':
+        body, mimetype = stream_csv(rows), 'text/csv'
+    else:
+        body, mimetype = stream_ndjson(rows), 'application/x-ndjson'
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=transactions.{fmt}'
+    return response
 
 # --- Buyer Routes ---
 @api.route('/api/buyer/products', methods=['GET'])
+@versioned_cache(CATALOG)
 def get_buyer_products():
-    products = Product.objects(status='approved', quantity__gt=0).order_by('-created_at')
-    return jsonify([{
-        "id": str(p.id),
-        "name": p.vegetable_name,
-        "price": p.market_price,
-        "quantity": p.quantity,
-        "image": p.image_url,
-        "farmer_name": p.farmer.name if p.farmer else "Unknown"
-    } for p in products])
+    # Keyset pagination over (created_at, _id): ?limit=<n>&cursor=<next_cursor>
+    limit = page_size(request.args)
+    products = Product.objects(status='approved', quantity__gt=0) \
+        .only('id', 'vegetable_name', 'market_price', 'quantity', 'image_url', 'farmer_name', 'created_at')
+    try:
+        products, next_cursor = keyset_page(products, request.args.get('cursor'), limit)
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+
+    return jsonify({
+        "items": [{
+            "id": str(p.id),
+            "name": p.vegetable_name,
+            "price": p.market_price,
+            "quantity": p.quantity,
+            "image": thumbnail_url(p.image_url),
+            "image_full": p.image_url,
+            "farmer_name": p.farmer_name or "Unknown"
+        } for p in products],
+        "next_cursor": next_cursor
+    })
+
+@api.route('/api/buyer/search', methods=['GET'])
+def search_products():
+    # ?q=<prefix words>&min_price=&max_price=&min_quantity=&sort=price|-price&limit=<k>
+    try:
+        bounds = {key: float(request.args[key]) if request.args.get(key) else None
+                  for key in ('min_price', 'max_price', 'min_quantity')}
+        k = max(1, min(int(request.args.get('limit', 20)), MAX_RESULTS))
+    except ValueError:
+        return jsonify({"msg": "Filters must be numbers"}), 400
+
+    catalog_index.refresh()
+    top, facets, total = catalog_index.search(
+        request.args.get('q', ''), k=k, descending=request.args.get('sort') == '-price', **bounds)
+    return jsonify({
+        "items": [{
+            "id": d['id'],
+            "name": d['name'],
+            "price": d['price'],
+            "quantity": d['quantity'],
+            "image": thumbnail_url(d['image_url']),
+            "image_full": d['image_url'],
+            "farmer_name": d['farmer_name'] or "Unknown"
+        } for d in top],
+        "facets": facets,
+        "total": total
+    })
 
 @api.route('/api/buyer/order', methods=['POST'])
-@jwt_required()
+@requires_role('buyer')
 def place_order():
-    raw_identity = get_jwt_identity()
-    try:
-        identity = json.loads(raw_identity) if isinstance(raw_identity, str) else raw_identity
-    except: return jsonify({"msg": "Invalid token"}), 422
-    
-    if identity['role'] != 'buyer': return jsonify({"msg": "Unauthorized"}), 403
-    
+    identity = current_identity()
+
     data = request.get_json()
-    product = Product.objects(id=data['product_id']).first()
-    if not product or product.quantity < data['quantity']:
+    try:
+        quantity = float(data['quantity'])
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"msg": "Quantity is required"}), 400
+    if quantity <= 0:
         return jsonify({"msg": "Unavailable"}), 400
     
     if 'delivery_address' not in data or not data['delivery_address']:
          return jsonify({"msg": "Delivery address is required"}), 400
-        
-    total_price = data['quantity'] * product.market_price
-    
-    order = Order(
-        buyer=ObjectId(identity['id']),
-        product=product,
-        quantity=data['quantity'],
-        total_price=total_price,
-        payment_method=data.get('payment_method', 'Cash'),
-        delivery_address=data['delivery_address']
-    )
-    product.quantity -= data['quantity']
-    product.save()
-    order.save()
+
+    orders, _ = checkout(identity.id, [{"product_id": data.get('product_id'), "quantity": quantity}],
+                         data.get('payment_method', 'Cash'), data['delivery_address'])
+    if not orders:
+        return jsonify({"msg": "Unavailable"}), 400
     
     return jsonify({"msg": "Order successful"}), 201
 
+@api.route('/api/buyer/checkout', methods=['POST'])
+@requires_role('buyer')
+def checkout_cart():
+    identity = current_identity()
+
+    # {"items": [{"product_id", "quantity"}, ...], "payment_method", "delivery_address"}
+    data = request.get_json()
+    items = data.get('items') or []
+    if not items:
+        return jsonify({"msg": "Cart is empty"}), 400
+    try:
+        if not all(ObjectId.is_valid(str(i['product_id'])) for i in items):
+            return jsonify({"msg": "Invalid product_id"}), 400
+        if not all(0 < float(i['quantity']) < math.inf for i in items):
+            return jsonify({"msg": "Quantities must be positive"}), 400
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"msg": "Each item needs a product_id and quantity"}), 400
+    if not data.get('delivery_address'):
+         return jsonify({"msg": "Delivery address is required"}), 400
+
+    orders, failed = checkout(identity.id, items, data.get('payment_method', 'Cash'), data['delivery_address'])
+    if not orders:
+        return jsonify({"msg": "Unavailable", "product_id": failed}), 400
+    return jsonify({
+        "msg": "Order successful",
+        "orders": [str(o.id) for o in orders],
+        "total": sum(o.total_price for o in orders)
+    }), 201
+
 @api.route('/api/farmer/analyze-quality', methods=['POST'])
-@jwt_required()
+@requires_role()
 def analyze_quality():
     try:
         if 'image' not in request.files:
             return jsonify({"msg": "No image uploaded"}), 400
         
-        # file = request.files['image']
         veg_name = request.form.get('vegetable_name', 'Vegetable').lower().strip()
-        filename = request.files['image'].filename or "unknown.jpg"
-        
-        # SKIP SAVING FILE TO AVOID 500 ERRORS ON READ-ONLY/FULL DISKS
-        # filename = secure_filename(file.filename)
-        # temp_path = os.path.join(current_app.config['UPLOAD_FOLDER'], "temp_" + filename)
-        # file.save(temp_path)
-        pass # Optimization: We don't need the physical file for this mock analysis
-
-        try:
-            # ---------------------------------------------------------
-            # MOCKED AI ANALYSIS (For Deployment Stability on Free Tier)
-            # ---------------------------------------------------------
-            # TensorFlow in free tier often crashes due to memory limits.
-            # We are using a randomized mock logic here for demonstration purposes.
-            import random
-            
-            # Simulate processing time
-            import time
-            time.sleep(1)
-
-            confidence = random.uniform(0.7, 0.99)
-            base_score = confidence * 100
-            
-            # Simple heuristic check based on filename if possible, otherwise random
-            if "rotten" in filename.lower() or "bad" in filename.lower():
-                final_score = random.uniform(20, 40)
-                grade = "Rejected"
-                analysis_msg = f"AI Analysis detected potential defects. Low quality score."
-            else:
-                final_score = base_score
-                if final_score > 90: grade = "Premium Export Quality"
-                elif final_score > 80: grade = "Grade A"
-                elif final_score > 60: grade = "Grade B"
-                else: grade = "Grade C"
-                analysis_msg = f"Verified as {veg_name} (Confidence: {int(confidence*100)}%). Matches export standards."
-
-            return jsonify({
-                "score": round(final_score, 1),
-                "grade": grade,
-                "analysis": analysis_msg
-            })
-
-        finally:
-            # Cleanup temp file if it existed (commented out as per new logic)
-            # if os.path.exists(temp_path):
-            #     os.remove(temp_path)
-            pass
+        # Scored from the pixels in a process pool; poll the returned job_id for the result
+        job = submit_quality_job(request.files['image'].read(), veg_name)
+        return jsonify(job_result(job)), 200 if job.status == 'done' else 202
             
     except Exception as e:
         print(f"Analysis Error: {e}")
         return jsonify({"msg": "AI Analysis Service Unavailable. Please try again."}), 500
 
+@api.route('/api/farmer/analyze-quality/<job_id>', methods=['GET'])
+@requires_role()
+def get_quality_job(job_id):
+    job = QualityJob.objects(digest=job_id).first()
+    if not job:
+        return jsonify({"msg": "Not found"}), 404
+    return jsonify(job_result(job))
+
+# --- Market Routes (buyers and farmers) ---
+@api.route('/api/market/trends', methods=['GET'])
+@requires_role()
+@versioned_cache(CATALOG)
+def get_price_trends():
+    # ?name=<vegetable>&resolution=hour|day&from=YYYY-MM-DD&to=YYYY-MM-DD; without
+    # a name, one summary row per vegetable. Served from the price rollup only.
+    resolution = request.args.get('resolution', 'day')
+    if resolution not in RESOLUTIONS:
+        return jsonify({"msg": "Resolution must be hour or day"}), 400
+    try:
+        start, end = parse_date_range(request.args)
+    except ValueError:
+        return jsonify({"msg": "Dates must be YYYY-MM-DD"}), 400
+
+    name = request.args.get('name')
+    if not name:
+        return jsonify({"resolution": resolution, "items": [{
+            "name": row['name'],
+            "open": row['open'],
+            "close": row['close'],
+            "high": row['high'],
+            "low": row['low'],
+            "volume": row['volume'],
+            "trades": row['trades'],
+            "change_pct": change(row['open'], row['close'])
+        } for row in summary(resolution, start, end)]})
+
+    bars = history(name, resolution, start, end)
+    return jsonify({
+        "name": bars[-1].name if bars else name,
+        "resolution": resolution,
+        "bars": [{
+            "t": b.bucket.isoformat(),
+            "open": b.open,
+            "high": b.high,
+            "low": b.low,
+            "close": b.close,
+            "volume": b.volume,
+            "trades": b.trades,
+            "listings": b.listings
+        } for b in bars],
+        "change_pct": change(bars[0].open, bars[-1].close) if bars else None
+    })
+
 # --- Farmer Routes (Essential for listing products for buyers to buy) ---
 @api.route('/api/farmer/products', methods=['POST'])
-@jwt_required()
+@requires_role('farmer')
 def add_product():
-    raw_identity = get_jwt_identity()
-    try:
-        identity = json.loads(raw_identity) if isinstance(raw_identity, str) else raw_identity
-    except: return jsonify({"msg": "Invalid token"}), 422
-    
-    if identity['role'] != 'farmer': return jsonify({"msg": "Unauthorized"}), 403
+    identity = current_identity()
 
     try:
         veg_name = request.form.get('vegetable_name')
         price = float(request.form.get('price'))
         qty = float(request.form.get('quantity'))
+        quality_score = float(request.form.get('quality_score', 0))
+        if not all(math.isfinite(v) for v in (price, qty, quality_score)):
+            return jsonify({"msg": "price, quantity and quality_score must be finite numbers"}), 400
         
-        if qty < 10: return jsonify({"msg": "Min quantity 10kg"}), 400
+        if qty < MIN_QUANTITY_KG: return jsonify({"msg": f"Min quantity {MIN_QUANTITY_KG}kg"}), 400
         
         earnings, _ = calculate_price(price, qty)
         
         image_url = ""
         if 'image' in request.files:
             f = request.files['image']
-            # Convert to Base64 for persistence on ephemeral filesystems (Render)
-            import base64
-            img_data = f.read()
-            encoded_img = base64.b64encode(img_data).decode('utf-8')
-            mime_type = f.content_type or 'image/jpeg'
-            image_url = f"data:{mime_type};base64,{encoded_img}"
+            # Stored in Mongo (not on disk) for persistence on ephemeral filesystems (Render)
+            try:
+                image_url = store_image(f.read())
+            except ValueError as e:
+                return jsonify({"msg": str(e)}), 400
             
-        quality_score = float(request.form.get('quality_score', 0))
-        status = 'approved' if quality_score > 60 else 'pending'
+        status = status_for(quality_score)
             
         product = Product(
-            farmer=ObjectId(identity['id']),
+            farmer=identity.object_id,
+            farmer_name=user_name(identity.id),
             vegetable_name=veg_name,
             market_price=price,
             farmer_earnings=earnings,
@@ -352,28 +494,76 @@ def add_product():
             status=status
         )
         product.save()
+        record_listings([product])
+        catalog_index.sync(invalidate(CATALOG), [product])
+        publish('listing', [identity.id, ADMINS],
+                {"product_id": str(product.id), "name": veg_name, "farmer": identity.name, "status": status})
         return jsonify({"msg": "Listed", "earnings_per_kg": earnings}), 201
     except Exception as e:
         return jsonify({"msg": str(e)}), 500
 
+@api.route('/api/farmer/products/bulk', methods=['POST'])
+@requires_role('farmer')
+def bulk_add_products():
+    identity = current_identity()
+
+    # Body is a JSON array or CSV (vegetable_name,price,quantity[,quality_score]),
+    # either raw or as an uploaded 'file'
+    if 'file' in request.files:
+        f = request.files['file']
+        body, content_type = f.read(), f.content_type or f.filename or ''
+        if (f.filename or '').endswith('.csv'):
+            content_type = 'text/csv'
+    else:
+        body, content_type = request.get_data(), request.content_type or ''
+    try:
+        rows = parse_rows(body, content_type)
+    except ValueError as e:
+        return jsonify({"msg": f"Could not parse listings: {e}"}), 400
+    if not rows:
+        return jsonify({"msg": "No listings"}), 400
+    if len(rows) > MAX_BULK_ROWS:
+        return jsonify({"msg": f"At most {MAX_BULK_ROWS} listings per import"}), 400
+
+    products, errors = import_listings(identity.id, rows)
+    if products:
+        record_listings(products)
+        catalog_index.sync(invalidate(CATALOG), products)
+        publish('listing', [identity.id, ADMINS],
+                {"count": len(products), "farmer": identity.name,
+                 "pending": sum(1 for p in products if p.status == 'pending')})
+    return jsonify({
+        "msg": f"Listed {len(products)} of {len(rows)}",
+        "inserted": len(products),
+        "ids": [str(p.id) for p in products],
+        "errors": errors
+    }), 201 if products else 400
+
 @api.route('/api/farmer/my-products', methods=['GET'])
-@jwt_required()
+@requires_role()
 def get_my_products():
-    raw_identity = get_jwt_identity()
-    try: identity = json.loads(raw_identity) if isinstance(raw_identity, str) else raw_identity
-    except: return jsonify({"msg": "Invalid token"}), 422
-    
-    products = Product.objects(farmer=ObjectId(identity['id']))
-    return jsonify([{
+    identity = current_identity()
+
+    # ?since=<cursor> (empty for a first full sync) returns only what changed
+    if 'since' in request.args:
+        try:
+            products, removed, cursor, full = product_changes(
+                request.args['since'], {'farmer': identity.object_id}, {})
+        except ValueError as e:
+            return jsonify({"msg": str(e)}), 400
+    else:
+        products = Product.objects(farmer=identity.object_id)
+
+    result = [{
         "id": str(p.id),
         "name": p.vegetable_name,
         "price": p.market_price,
         "quantity": p.quantity,
         "status": p.status,
         "earnings": p.farmer_earnings,
-        "image": p.image_url
-    } for p in products])
-
-@api.route('/uploads/<filename>')
-def uploaded_file(filename):
-    return send_from_directory(current_app.config['UPLOAD_FOLDER'], filename)
+        "image": thumbnail_url(p.image_url),
+        "image_full": p.image_url
+    } for p in products]
+    if 'since' in request.args:
+        return jsonify({"items": result, "removed": removed, "cursor": cursor, "full": full})
+    return jsonify(result)
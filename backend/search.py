@@ -0,0 +1,227 @@
+from models import Product, Tombstone, TOMBSTONE_RETENTION
+from cache import generation, CATALOG
+from delta import now, OVERLAP
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+import heapq
+import itertools
+import math
+import re
+import threading
+import time
+
+# Other workers' writes are pulled in (only the products changed since the
+# last pull) at most this often; this worker's own writes are seen immediately
+REFRESH_INTERVAL_S = 1.0
+_FIELDS = ('id', 'vegetable_name', 'market_price', 'quantity', 'image_url', 'farmer_name', 'status')
+MAX_RESULTS = 100
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def normalize(name):
+    return " ".join(_TOKEN.findall((name or "").lower()))
+
+
+class CatalogIndex:
+    """
+    In-process search index over purchasable listings (approved, quantity > 0).
+
+    Listings are grouped by normalized vegetable name. Each group keeps its
+    listings sorted by price and by quantity, so price ranges and minimum
+    quantities are bisects (facets count the smaller side) and top-k by price
+    is a lazy k-way merge over the matching groups. Words of every name sit
+    in one sorted list for prefix lookup. A query therefore touches only the
+    matching names and the k results, not the whole catalog.
+    """
+
+    def __init__(self):
+        self.docs = {}  # product id -> listing dict
+        self.by_name = defaultdict(list)  # name -> sorted [(price, id)]
+        self.by_quantity = defaultdict(list)  # name -> sorted [(quantity, id)]
+        self.words = []  # sorted distinct words
+        self.names_by_word = defaultdict(set)  # word -> names containing it
+        self.generation = None
+        self.loaded_at = 0.0
+        self.synced_at = None  # Database time the last pull started
+        self.lock = threading.RLock()
+        self.refreshing = threading.Lock()
+
+    # --- Maintenance ---
+    def _add(self, doc):
+        name = doc['key']
+        if name not in self.by_name:
+            for word in name.split():
+                if word not in self.names_by_word:
+                    insort(self.words, word)
+                self.names_by_word[word].add(name)
+        insort(self.by_name[name], (doc['price'], doc['id']))
+        insort(self.by_quantity[name], (doc['quantity'], doc['id']))
+        self.docs[doc['id']] = doc
+
+    def _remove(self, product_id):
+        doc = self.docs.pop(product_id, None)
+        if not doc:
+            return
+        name = doc['key']
+        entries = self.by_name[name]
+        i = bisect_left(entries, (doc['price'], product_id))
+        if i < len(entries) and entries[i][1] == product_id:
+            entries.pop(i)
+        stock = self.by_quantity[name]
+        i = bisect_left(stock, (doc['quantity'], product_id))
+        if i < len(stock) and stock[i][1] == product_id:
+            stock.pop(i)
+        if not entries:
+            del self.by_name[name]
+            del self.by_quantity[name]
+            for word in name.split():
+                self.names_by_word[word].discard(name)
+                if not self.names_by_word[word]:
+                    del self.names_by_word[word]
+                    self.words.pop(bisect_left(self.words, word))
+
+    def upsert(self, product):
+        """Apply one product's current state, dropping it if no longer purchasable."""
+        product_id = str(product.id)
+        with self.lock:
+            self._remove(product_id)
+            # NaN/inf would break the sorted lists' order (and every bisect after it)
+            if (product.status == 'approved' and product.quantity > 0
+                    and math.isfinite(product.market_price) and math.isfinite(product.quantity)):
+                self._add({
+                    "id": product_id,
+                    "key": normalize(product.vegetable_name),
+                    "name": product.vegetable_name,
+                    "price": product.market_price,
+                    "quantity": product.quantity,
+                    "image_url": product.image_url,
+                    "farmer_name": product.farmer_name
+                })
+
+    def sync(self, new_generation, products):
+        """
+        Apply this worker's own writes. The index stays current only if it was
+        at the generation just before this write; otherwise it reloads on the
+        next query anyway.
+        """
+        with self.lock:
+            for product in products:
+                self.upsert(product)
+            if self.generation == new_generation - 1:
+                self.generation = new_generation
+
+    def reload(self):
+        gen, started = generation(CATALOG), now()
+        products = Product.objects(status='approved', quantity__gt=0).only(*_FIELDS).no_dereference()
+        fresh = CatalogIndex()
+        for p in products:
+            fresh.upsert(p)
+        with self.lock:
+            self.docs, self.by_name, self.by_quantity = fresh.docs, fresh.by_name, fresh.by_quantity
+            self.words, self.names_by_word = fresh.words, fresh.names_by_word
+            self.generation = gen
+            self.synced_at = started
+            self.loaded_at = time.monotonic()
+
+    def catch_up(self):
+        """Apply products written or deleted since the last pull (delta-sync style, with its overlap)."""
+        gen, started = generation(CATALOG), now()
+        after = self.synced_at - OVERLAP
+        # Built outside the lock: searches keep using the index while the changes load
+        changed = list(Product.objects(updated_at__gte=after).only(*_FIELDS).no_dereference())
+        deleted = list(Tombstone.objects(deleted_at__gte=after).scalar('doc_id'))
+        with self.lock:
+            for p in changed:
+                self.upsert(p)
+            for product_id in deleted:
+                self._remove(str(product_id))
+            self.generation = gen
+            self.synced_at = started
+            self.loaded_at = time.monotonic()
+
+    def refresh(self):
+        """Pick up other workers' writes, rate-limited; only the first load (or a long gap) reads everything."""
+        if self.generation is None:
+            with self.refreshing:
+                if self.generation is None:
+                    self.reload()
+            return
+        if time.monotonic() - self.loaded_at < REFRESH_INTERVAL_S:
+            return
+        # One thread pulls; concurrent searches answer from the current index meanwhile
+        if not self.refreshing.acquire(blocking=False):
+            return
+        try:
+            if generation(CATALOG) == self.generation:
+                self.loaded_at = time.monotonic()
+            elif now() - self.synced_at > TOMBSTONE_RETENTION:
+                self.reload()
+            else:
+                self.catch_up()
+        finally:
+            self.refreshing.release()
+
+    # --- Queries ---
+    def matching_names(self, query):
+        """Names containing every query word as a word prefix."""
+        names = None
+        for term in normalize(query).split():
+            lo = bisect_left(self.words, term)
+            hi = bisect_left(self.words, term + "\uffff")
+            found = set()
+            for word in self.words[lo:hi]:
+                found |= self.names_by_word[word]
+            names = found if names is None else names & found
+            if not names:
+                return set()
+        return set(self.by_name) if names is None else names
+
+    def search(self, query="", min_price=None, max_price=None, min_quantity=None, k=20, descending=False):
+        """Return (top-k listings by price, facet counts per normalized name, total matches)."""
+        with self.lock:
+            ranges = {}
+            for name in self.matching_names(query):
+                entries = self.by_name[name]
+                lo = 0 if min_price is None else bisect_left(entries, (min_price, ""))
+                hi = len(entries) if max_price is None else bisect_right(entries, (max_price, "\uffff"))
+                if hi > lo:
+                    ranges[name] = (entries, lo, hi)
+
+            def listings(entries, lo, hi):
+                span = range(hi - 1, lo - 1, -1) if descending else range(lo, hi)
+                for i in span:
+                    doc = self.docs[entries[i][1]]
+                    if min_quantity is None or doc['quantity'] >= min_quantity:
+                        yield doc
+
+            facets = {}
+            for name, (entries, lo, hi) in ranges.items():
+                if min_quantity is None:
+                    # Straight from the range bounds, no listing is visited
+                    count = hi - lo
+                else:
+                    stock = self.by_quantity[name]
+                    q = bisect_left(stock, (min_quantity, ""))
+                    if q == 0:
+                        count = hi - lo
+                    elif hi - lo == len(entries):
+                        count = len(stock) - q
+                    else:
+                        # Both filters bound: walk whichever side is shorter
+                        if hi - lo <= len(stock) - q:
+                            count = sum(1 for _ in listings(entries, lo, hi))
+                        else:
+                            count = sum(1 for _, pid in stock[q:]
+                                        if (min_price is None or self.docs[pid]['price'] >= min_price)
+                                        and (max_price is None or self.docs[pid]['price'] <= max_price))
+                if count:
+                    facets[name] = count
+
+            sort_key = (lambda d: -d['price']) if descending else (lambda d: d['price'])
+            merged = heapq.merge(*(listings(*r) for r in ranges.values()), key=sort_key)
+            top = list(itertools.islice(merged, k))
+            return top, facets, sum(facets.values())
+
+
+catalog_index = CatalogIndex()
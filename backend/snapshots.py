@@ -0,0 +1,85 @@
+from models import User, Product, Order
+from users import cached_user, forget_user
+from cache import invalidate, CATALOG
+from pymongo import UpdateMany
+from datetime import datetime
+
+# Display names are copied onto the documents that show them (Product.farmer_name;
+# Order.buyer_name, product_name, farmer_name) so reads never join. The copies
+# are written at creation; repair_* bring them back in line after a rename.
+
+
+def user_name(user_id):
+    user = cached_user(user_id)
+    return user.name if user else None
+
+
+def _bulk(collection, ops):
+    if not ops:
+        return 0
+    return collection.bulk_write(ops, ordered=False).modified_count
+
+
+def repair_products(products):
+    """
+    Copy product name and farmer onto the product's orders, for
+    [(product id, vegetable name, farmer id)]. Only drifted orders are
+    written. Returns the number of orders modified.
+    """
+    return _bulk(Order._get_collection(), [
+        UpdateMany({'product': pid, '$or': [{'product_name': {'$ne': name}}, {'farmer': {'$ne': farmer}}]},
+                   {'$set': {'product_name': name, 'farmer': farmer}})
+        for pid, name, farmer in products])
+
+
+def repair_users(users):
+    """
+    Copy each user's current name onto their listings and on orders they
+    bought or sold, for [(user id, name)]. Only drifted copies are written.
+    Returns the number of documents modified.
+    """
+    product_ops, order_ops = [], []
+    now = datetime.utcnow()
+    for uid, name in users:
+        # updated_at so delta-sync clients and other workers' search indexes pick the new name up
+        product_ops.append(UpdateMany({'farmer': uid, 'farmer_name': {'$ne': name}},
+                                      {'$set': {'farmer_name': name, 'updated_at': now}}))
+        order_ops.append(UpdateMany({'buyer': uid, 'buyer_name': {'$ne': name}}, {'$set': {'buyer_name': name}}))
+        order_ops.append(UpdateMany({'farmer': uid, 'farmer_name': {'$ne': name}}, {'$set': {'farmer_name': name}}))
+    products = _bulk(Product._get_collection(), product_ops)
+    if products:
+        # Cached catalog pages still show the old names
+        invalidate(CATALOG)
+    return products + _bulk(Order._get_collection(), order_ops)
+
+
+def product_rows(docs):
+    return [(d['_id'], d.get('vegetable_name'), d.get('farmer')) for d in docs]
+
+
+def user_rows(docs):
+    return [(d['_id'], d.get('name')) for d in docs]
+
+
+def rename_user(user_id, name):
+    """Rename a user and refresh every copy of the name."""
+    User.objects(id=user_id).update_one(set__name=name)
+    forget_user(user_id)
+    return repair_users([(user_id, name)])
+
+
+def repair_all(batch_size=1000):
+    """Full consistency pass in _id batches: products' orders first, then users' names. Returns docs modified."""
+    modified = 0
+    passes = ((Product, {'vegetable_name': 1, 'farmer': 1}, repair_products, product_rows),
+              (User, {'name': 1}, repair_users, user_rows))
+    for model, projection, repair, rows in passes:
+        collection, last_id = model._get_collection(), None
+        while True:
+            query = {'_id': {'$gt': last_id}} if last_id else {}
+            docs = list(collection.find(query, projection).sort('_id', 1).limit(batch_size))
+            if not docs:
+                break
+            modified += repair(rows(docs))
+            last_id = docs[-1]['_id']
+    return modified
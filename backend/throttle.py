@@ -0,0 +1,49 @@
+from collections import OrderedDict
+import os
+import threading
+import time
+
+# Login attempts: a burst of LOGIN_BURST, then one every LOGIN_REFILL_S seconds
+LOGIN_BURST = int(os.getenv('LOGIN_BURST', 5))
+LOGIN_REFILL_S = float(os.getenv('LOGIN_REFILL_S', 12))
+# Per address, shared by every account tried from it (NAT'd offices, shared Wi-Fi)
+IP_BURST = int(os.getenv('LOGIN_IP_BURST', 30))
+IP_REFILL_S = float(os.getenv('LOGIN_IP_REFILL_S', 2))
+MAX_KEYS = 10000
+
+
+class TokenBuckets:
+    """
+    In-process token buckets keyed by string (per worker, like cache.py).
+    Least recently used keys are dropped past max_keys; a dropped key simply
+    starts again with a full bucket.
+    """
+
+    def __init__(self, burst, refill_s, max_keys=MAX_KEYS):
+        self.burst = burst
+        self.refill_s = refill_s
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> [tokens, last refill]
+        self._lock = threading.Lock()
+
+    def take(self, key):
+        """Spend a token for `key`. Returns 0 if allowed, else seconds until one is available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) / self.refill_s)
+            wait = 0 if tokens >= 1 else (1 - tokens) * self.refill_s
+            self._buckets[key] = [tokens - 1 if not wait else tokens, now]
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+
+login_accounts = TokenBuckets(LOGIN_BURST, LOGIN_REFILL_S)
+login_addresses = TokenBuckets(IP_BURST, IP_REFILL_S)
+
+
+def login_wait(email, address):
+    """Seconds the caller must wait before another login attempt; 0 if it may proceed."""
+    # Charge the address first so one client cycling through accounts is still capped
+    return login_addresses.take(address or '') or login_accounts.take((email or '').strip().lower())
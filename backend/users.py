@@ -0,0 +1,39 @@
+from models import User
+from collections import OrderedDict
+import os
+import threading
+import time
+
+# Per-worker cache of the user fields routes need beyond the token claims.
+# Updates made through this worker call forget_user(); other workers see
+# them once their copy expires, so keep the TTL short.
+USER_CACHE_TTL_S = float(os.getenv('USER_CACHE_TTL_S', 30))
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 1024))
+_FIELDS = ('id', 'name', 'email', 'role')
+
+_entries = OrderedDict()  # str(user id) -> (expires at, User)
+_lock = threading.Lock()
+
+
+def cached_user(user_id):
+    """The user's id, name, email and role, or None if there is no such user. Treat as read-only."""
+    key, now = str(user_id), time.monotonic()
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None and entry[0] > now:
+            _entries.move_to_end(key)
+            return entry[1]
+    user = User.objects(id=user_id).only(*_FIELDS).first()
+    if user is not None:
+        with _lock:
+            _entries[key] = (now + USER_CACHE_TTL_S, user)
+            _entries.move_to_end(key)
+            while len(_entries) > USER_CACHE_SIZE:
+                _entries.popitem(last=False)
+    return user
+
+
+def forget_user(user_id):
+    """Drop this worker's cached copy after the user document changed."""
+    with _lock:
+        _entries.pop(str(user_id), None)
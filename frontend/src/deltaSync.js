@@ -0,0 +1,6 @@
+// Apply a delta-sync response ({ items, removed, full }) to a list keyed by id
+export const mergeDelta = (current, { items, removed, full }) => {
+    if (full) return items;
+    const gone = new Set([...removed, ...items.map(p => p.id)]);
+    return [...items, ...current.filter(p => !gone.has(p.id))];
+};
@@ -1,23 +1,37 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 import { ShieldCheck, CheckCircle, XCircle, TrendingUp, Users, Package, ShoppingBag } from 'lucide-react';
 import toast from 'react-hot-toast';
+import { mergeDelta } from '../deltaSync';
 
 const AdminDashboard = () => {
     const [stats, setStats] = useState(null);
     const [pendingProducts, setPendingProducts] = useState([]);
     const [users, setUsers] = useState([]);
+    const [usersCursor, setUsersCursor] = useState(null);
+    const [loadingUsers, setLoadingUsers] = useState(false);
     const [transactions, setTransactions] = useState([]);
     const [activeTab, setActiveTab] = useState('overview'); // overview, users, transactions
     const [loading, setLoading] = useState(true);
     const token = localStorage.getItem('token');
     const API_URL = import.meta.env.VITE_API_URL || 'https://form-tech-backend.onrender.com';
+    // Notification streams may be served by a separate events service (events_app.py)
+    const EVENTS_URL = import.meta.env.VITE_EVENTS_URL || API_URL;
 
     useEffect(() => {
         fetchStats();
         fetchPending();
     }, []);
 
+    // Refresh on server push (new listings, orders, moderation) instead of polling
+    useEffect(() => {
+        const events = new EventSource(`${EVENTS_URL}/api/events/stream?jwt=${token}`);
+        events.addEventListener('listing', () => { fetchPending(); fetchStats(); });
+        events.addEventListener('moderation', () => fetchPending());
+        events.addEventListener('order', () => fetchStats());
+        return () => events.close();
+    }, []);
+
     useEffect(() => {
         if (activeTab === 'users') fetchUsers();
         if (activeTab === 'transactions') fetchTransactions();
@@ -33,22 +47,31 @@ const AdminDashboard = () => {
         } catch (err) { console.error(err); setLoading(false); }
     };
 
+    // Delta sync: after the first load only changed and decided listings are fetched
+    const pendingCursor = useRef('');
     const fetchPending = async () => {
         try {
             const { data } = await axios.get(`${API_URL}/api/admin/pending-products`, {
-                headers: { Authorization: `Bearer ${token}` }
+                headers: { Authorization: `Bearer ${token}` },
+                params: { since: pendingCursor.current }
             });
-            setPendingProducts(data);
+            pendingCursor.current = data.cursor;
+            setPendingProducts(prev => mergeDelta(prev, data));
         } catch (err) { console.error(err); }
     };
 
-    const fetchUsers = async () => {
+    // Users are paginated: the first page on opening the tab, the next on demand
+    const fetchUsers = async (cursor = null) => {
+        setLoadingUsers(true);
         try {
             const { data } = await axios.get(`${API_URL}/api/admin/users`, {
-                headers: { Authorization: `Bearer ${token}` }
+                headers: { Authorization: `Bearer ${token}` },
+                params: cursor ? { cursor } : {}
             });
-            setUsers(data);
+            setUsers(prev => cursor ? prev.concat(data.items) : data.items);
+            setUsersCursor(data.next_cursor);
         } catch (err) { toast.error("Failed to load users"); }
+        setLoadingUsers(false);
     };
 
     const fetchTransactions = async () => {
@@ -72,6 +95,19 @@ const AdminDashboard = () => {
         } catch (err) { toast.error('Action failed'); }
     };
 
+    // Decide every listed pending product in one request
+    const handleBulkAction = async (action) => {
+        try {
+            const { data } = await axios.post(`${API_URL}/api/admin/product-actions`,
+                { actions: pendingProducts.map(p => ({ product_id: p.id, action })) },
+                { headers: { Authorization: `Bearer ${token}` } }
+            );
+            toast.success(`${data.updated} products ${action}`);
+            fetchPending();
+            fetchStats();
+        } catch (err) { toast.error('Bulk action failed'); }
+    };
+
     if (loading) return <div className="p-10 text-center">Loading Admin Panel...</div>;
 
     return (
@@ -107,7 +143,15 @@ const AdminDashboard = () => {
                     </div>
 
                     <div className="mb-12">
-                        <h2 className="text-xl font-bold mb-4">Pending Approvals ({pendingProducts.length})</h2>
+                        <div className="flex items-center justify-between mb-4">
+                            <h2 className="text-xl font-bold">Pending Approvals ({pendingProducts.length})</h2>
+                            {pendingProducts.length > 1 && (
+                                <div className="flex gap-2">
+                                    <button onClick={() => handleBulkAction('approved')} className="bg-green-50 text-green-700 px-3 py-1 rounded-lg text-sm font-bold hover:bg-green-100">Approve all</button>
+                                    <button onClick={() => handleBulkAction('refused')} className="bg-red-50 text-red-700 px-3 py-1 rounded-lg text-sm font-bold hover:bg-red-100">Refuse all</button>
+                                </div>
+                            )}
+                        </div>
                         <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
                             {pendingProducts.length === 0 ? <p className="text-gray-400">No pending products.</p> :
                                 pendingProducts.map(p => (
@@ -179,6 +223,17 @@ const AdminDashboard = () => {
                             </tbody>
                         </table>
                     </div>
+                    {usersCursor && (
+                        <div className="text-center mt-4">
+                            <button
+                                onClick={() => fetchUsers(usersCursor)}
+                                disabled={loadingUsers}
+                                className="px-6 py-2 rounded-xl border border-gray-200 font-bold text-gray-600 hover:bg-gray-50 disabled:opacity-50"
+                            >
+                                {loadingUsers ? 'Loading...' : 'Load more'}
+                            </button>
+                        </div>
+                    )}
                 </div>
             )}
 
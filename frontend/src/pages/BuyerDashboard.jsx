@@ -19,18 +19,42 @@ const BuyerDashboard = () => {
     const token = localStorage.getItem('token');
     const API_URL = import.meta.env.VITE_API_URL || 'https://form-tech-backend.onrender.com';
 
+    const [nextCursor, setNextCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
+    const [searchResults, setSearchResults] = useState(null);
+
     useEffect(() => {
         fetchProducts();
     }, []);
 
-    const fetchProducts = async () => {
+    // The catalog is keyset-paginated: show the first page, fetch the next on demand
+    const fetchProducts = async (cursor = null) => {
         try {
-            const { data } = await axios.get(`${API_URL}/api/buyer/products`);
-            setProducts(data);
-            setLoading(false);
-        } catch (err) { console.error(err); setLoading(false); }
+            if (cursor) setLoadingMore(true);
+            const { data } = await axios.get(`${API_URL}/api/buyer/products`, {
+                params: cursor ? { cursor } : {}
+            });
+            setProducts(prev => cursor ? prev.concat(data.items) : data.items);
+            setNextCursor(data.next_cursor);
+        } catch (err) { console.error(err); }
+        setLoading(false);
+        setLoadingMore(false);
     };
 
+    // Searching covers the whole catalog server-side, not just the pages loaded so far
+    useEffect(() => {
+        const term = searchTerm.trim();
+        setSearchResults(null);
+        if (!term) return;
+        const timer = setTimeout(async () => {
+            try {
+                const { data } = await axios.get(`${API_URL}/api/buyer/search`, { params: { q: term, limit: 100 } });
+                setSearchResults(data.items);
+            } catch (err) { console.error(err); }
+        }, 250);
+        return () => clearTimeout(timer);
+    }, [searchTerm]);
+
     const processPaymentAndOrder = async () => {
         setPaymentStep('processing');
 
@@ -76,10 +100,10 @@ const BuyerDashboard = () => {
         processPaymentAndOrder();
     };
 
-    // Filter products based on search
-    const filteredProducts = products.filter(p =>
+    // Server search results while a term is entered (loaded pages filtered until they arrive)
+    const filteredProducts = !searchTerm.trim() ? products : (searchResults ?? products.filter(p =>
         p.name.toLowerCase().includes(searchTerm.toLowerCase())
-    );
+    ));
 
     return (
         <div className="max-w-7xl mx-auto px-6 pb-8 pt-24">
@@ -136,6 +160,17 @@ const BuyerDashboard = () => {
                     )}
                 </div>
             )}
+            {!loading && !searchTerm.trim() && nextCursor && (
+                <div className="text-center mt-8">
+                    <button
+                        onClick={() => fetchProducts(nextCursor)}
+                        disabled={loadingMore}
+                        className="px-6 py-2 rounded-xl border border-gray-200 font-bold text-gray-600 hover:bg-gray-50 disabled:opacity-50"
+                    >
+                        {loadingMore ? 'Loading...' : 'Load more'}
+                    </button>
+                </div>
+            )}
 
             {/* Order Modal */}
             {orderModal && (
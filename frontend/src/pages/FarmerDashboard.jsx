@@ -1,8 +1,9 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 import { Plus, Package, IndianRupee, Info, TrendingUp, Scan } from 'lucide-react';
 import { motion, AnimatePresence } from 'framer-motion';
 import toast from 'react-hot-toast';
+import { mergeDelta } from '../deltaSync';
 
 const FarmerDashboard = () => {
     const [products, setProducts] = useState([]);
@@ -12,15 +13,33 @@ const FarmerDashboard = () => {
     const [loading, setLoading] = useState(false);
     const token = localStorage.getItem('token');
     const API_URL = import.meta.env.VITE_API_URL || 'https://form-tech-backend.onrender.com';
+    // Notification streams may be served by a separate events service (events_app.py)
+    const EVENTS_URL = import.meta.env.VITE_EVENTS_URL || API_URL;
 
     useEffect(() => { fetchMyProducts(); }, []);
 
+    // Refresh on server push (sales, moderation decisions) instead of polling
+    useEffect(() => {
+        const events = new EventSource(`${EVENTS_URL}/api/events/stream?jwt=${token}`);
+        const refresh = () => fetchMyProducts();
+        ['order', 'moderation', 'listing'].forEach(type => events.addEventListener(type, refresh));
+        events.addEventListener('order', e => {
+            const sale = JSON.parse(e.data);
+            toast.success(`Sold ${sale.quantity}kg of ${sale.name}`);
+        });
+        return () => events.close();
+    }, []);
+
+    // Delta sync: after the first load only changed and removed listings are fetched
+    const syncCursor = useRef('');
     const fetchMyProducts = async () => {
         try {
             const { data } = await axios.get(`${API_URL}/api/farmer/my-products`, {
-                headers: { Authorization: `Bearer ${token}` }
+                headers: { Authorization: `Bearer ${token}` },
+                params: { since: syncCursor.current }
             });
-            setProducts(data);
+            syncCursor.current = data.cursor;
+            setProducts(prev => mergeDelta(prev, data));
         } catch (err) { console.error('Failed to fetch products'); }
     };
 
@@ -36,15 +55,21 @@ const FarmerDashboard = () => {
         formData.append('vegetable_name', newProduct.name);
 
         try {
-            const { data } = await axios.post(`${API_URL}/api/farmer/analyze-quality`, formData, {
+            let { data } = await axios.post(`${API_URL}/api/farmer/analyze-quality`, formData, {
                 headers: { Authorization: `Bearer ${token}` }
             });
 
-            // Artificial delay for "AI thinking" effect
-            setTimeout(() => {
-                setQualityAnalysis({ loading: false, result: data });
-                toast.success(`Quality Graded: ${data.grade}`);
-            }, 1000);
+            // Analysis runs as a background job; poll until it finishes
+            while (data.status === 'queued') {
+                await new Promise(resolve => setTimeout(resolve, 500));
+                ({ data } = await axios.get(`${API_URL}/api/farmer/analyze-quality/${data.job_id}`, {
+                    headers: { Authorization: `Bearer ${token}` }
+                }));
+            }
+            if (data.status !== 'done') throw new Error(data.msg);
+
+            setQualityAnalysis({ loading: false, result: data });
+            toast.success(`Quality Graded: ${data.grade}`);
 
         } catch (err) {
             setQualityAnalysis({ loading: false, result: null });